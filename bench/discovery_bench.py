@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# the stand-in is local, only the polite per-host rate would be measured otherwise
+os.environ.setdefault("FETCH_HOST_RATE", "1000000")
+
+import cache
+import discovery
+import fetch
+import metrics
+import web
+
+import fixtures
+
+# requests for the CICS description pages in a first run and in the runs
+# after it, with and without discovery. the runs are incremental ones, with
+# the http cache and the parsed page cache on
+#
+#   python bench/discovery_bench.py [RUNS]
+
+CICS_PAGES = "/csinfo/autogen/cicsdesc"
+
+
+def run_courses():
+    metrics.reset()
+    start = time.perf_counter()
+    courses = list(web.iter_courses())
+    elapsed = time.perf_counter() - start
+
+    sources = {}
+    for request in metrics.fetches:
+        if CICS_PAGES in request['url']:
+            sources[request['source']] = sources.get(request['source'], 0) + 1
+
+    return elapsed, len(courses), sources, dict(metrics.parsed_cache)
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    server, base_url = fixtures.serve(fixtures.make_site(1))
+    fetch.close_session()
+    fixtures.route_session(fetch.get_session(), base_url, fetch.max_workers)
+    web.memoize_pages = True
+
+    try:
+        for enabled in [False, True]:
+            work_dir = tempfile.mkdtemp()
+            cache.cache_dir = os.path.join(work_dir, "cache")
+            discovery.state_path = os.path.join(work_dir, "cics_pages.json")
+            discovery.enabled = enabled
+
+            print("with discovery" if enabled else "without discovery")
+            for i in range(runs):
+                elapsed, count, sources, parsed = run_courses()
+                print(f"  run {i + 1}  {elapsed:6.3f}s  {count} courses  "
+                      f"CICS pages {', '.join(f'{n} {source}' for (source, n) in sorted(sources.items()))}  "
+                      f"parsed {parsed['miss']}, reused {parsed['hit']}")
+
+            shutil.rmtree(work_dir)
+    finally:
+        fetch.close_session()
+        server.shutdown()
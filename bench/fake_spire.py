@@ -0,0 +1,234 @@
+import os
+import sys
+import html
+import shutil
+import tempfile
+import threading
+import itertools
+
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# a local stand-in for the Spire course catalog. it keeps a PeopleSoft-like
+# session per ICSID and moves between the letter list, an expanded category
+# and a course page depending on the ICAction that is posted back
+
+CATEGORY_NAMES = {
+    "CICS": "Information & Computer Sciences",
+    "COMPSCI": "Computer Science",
+    "INFO": "Informatics",
+    "MATH": "Mathematics",
+    "STATISTC": "Statistics",
+}
+
+
+def make_catalog(scale=1):
+    # {category: [(number, {element id: text})]}
+    catalog = {}
+    for (position, category) in enumerate(CATEGORY_NAMES):
+        courses = []
+        for i in range(40 * scale):
+            number = str(100 + position * 7 + i * 3)
+            courses.append((number, {
+                "SSR_CRSE_OFF_VW_ACAD_CAREER$0": "Undergraduate",
+                "DERIVED_CRSECAT_UNITS_RANGE$0": f"{3 + i % 2} units",
+                "SSR_CRSE_OFF_VW_GRADING_BASIS$0": "Grad Ltr Grading" if i % 5 == 0 else "Letter Grading",
+                "DERIVED_CRSECAT_DESCR$0": "Lecture",
+                "DERIVED_CRSECAT_DESCR$1": "Discussion",
+                "DERIVED_CRSECAT_DESCR254A$0": f"Prerequisite: {category} {number}",
+                "DERIVED_CRSECAT_DESCR254A$1": "Open to majors only",
+            }))
+
+        catalog[category] = courses
+
+    return catalog
+
+
+class FakeSpire:
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.posts = 0
+
+    def new_session(self):
+        with self.lock:
+            session_id = str(next(self.ids))
+            self.sessions[session_id] = {
+                'state': 1, 'letter': None, 'category': None, 'course': None,
+            }
+
+        return session_id
+
+    def category_link_id(self, category):
+        return f"DERIVED_SSS_BCC_GROUP_BOX_1$147$${list(self.catalog).index(category)}"
+
+    def handle(self, form):
+        session = self.sessions.get(form.get('ICSID'))
+        if not session or form.get('ICStateNum') != str(session['state']):
+            return None, None
+
+        with self.lock:
+            self.posts += 1
+
+        action = form.get('ICAction', '')
+        if action.startswith("DERIVED_SSS_BCC_SSR_ALPHANUM_"):
+            session['letter'] = action[-1]
+            session['category'] = None
+        elif action == "DERIVED_SAA_CRS_RETURN_PB":
+            session['course'] = None
+        elif action.startswith("CRSE_NBR$") and session['category']:
+            session['course'] = int(action.split("$")[1])
+        else:
+            for category in self.catalog:
+                if action == self.category_link_id(category):
+                    # category links toggle like they do on spire
+                    session['category'] = None if session['category'] == category else category
+
+        session['state'] += 1
+
+        return form['ICSID'], session
+
+    def render(self, session_id, session):
+        hidden = (
+            f'<input type="hidden" name="ICSID" value="{session_id}">'
+            f'<input type="hidden" name="ICStateNum" value="{session["state"]}">'
+            '<input type="hidden" name="ICAction" value="None">'
+            '<input type="hidden" name="ICAJAX" value="1">'
+        )
+
+        if session['course'] is not None:
+            (_, fields) = self.catalog[session['category']][session['course']]
+            spans = "".join(
+                f'<span id="{elem_id}">{html.escape(text)}</span>\n'
+                for (elem_id, text) in fields.items()
+            )
+            body = (
+                '<table id="ACE_DERIVED_SAA_CRS_GROUP1"><tr><td>'
+                f'{spans}</td></tr></table>'
+                '<a id="DERIVED_SAA_CRS_RETURN_PB">Return</a>'
+            )
+        else:
+            letters = "".join(
+                f'<a id="DERIVED_SSS_BCC_SSR_ALPHANUM_{letter}">{letter}</a>'
+                for letter in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+            )
+            categories = ""
+            for category in self.catalog:
+                if category[0] != session['letter']:
+                    continue
+
+                categories += (
+                    f'<a class="SSSHYPERLINKBOLD" id="{self.category_link_id(category)}">'
+                    f'{category} - {CATEGORY_NAMES.get(category, category)}</a>\n'
+                )
+                if session['category'] == category:
+                    rows = "".join(
+                        f'<tr><td><a id="CRSE_NBR${i}">{number}</a></td></tr>'
+                        for (i, (number, _)) in enumerate(self.catalog[category])
+                    )
+                    categories += f'<table id="COURSE_LIST$scroll$0">{rows}</table>\n'
+
+            body = letters + categories
+
+        return (
+            '<html><body><form name="win0" method="post" action="/catalog">'
+            f'{hidden}{body}</form></body></html>'
+        ).encode("utf-8")
+
+
+def make_handler(fake: FakeSpire):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def respond(self, status, content=b""):
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            session_id = fake.new_session()
+            self.respond(200, fake.render(session_id, fake.sessions[session_id]))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", "0"))
+            form = {
+                key: values[0]
+                for (key, values) in parse_qs(self.rfile.read(length).decode("utf-8")).items()
+            }
+
+            session_id, session = fake.handle(form)
+            if not session:
+                self.respond(500, b"<html><body>Page No Longer Available</body></html>")
+                return
+
+            self.respond(200, fake.render(session_id, session))
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(catalog):
+    fake = FakeSpire(catalog)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(fake))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, fake, f"http://127.0.0.1:{server.server_address[1]}/catalog"
+
+
+def check():
+    # scrapes the fake catalog through the http backend and compares what
+    # was stored on every course with what the catalog holds
+    server, fake, url = serve(make_catalog())
+
+    os.environ["SPIRE_CATALOG_URL"] = url
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+    import spire
+    import spire_http
+    import spire_checkpoint
+    from records import Course
+
+    # the fake fields must never reach the checkpoint a real run reads
+    work_dir = tempfile.mkdtemp()
+    spire_checkpoint.checkpoint_path = os.path.join(work_dir, "spire_checkpoint.jsonl")
+    spire_http.catalog_url = url
+    spire.backend = "http"
+    spire.workers = 3
+
+    course_map = {}
+    for (category, courses) in fake.catalog.items():
+        for (number, _) in courses[::2]:
+            course_id = f"{category} {number}"
+            course_map[course_id] = Course(id=course_id)
+
+    try:
+        spire.scrape_additional_course_information(course_map)
+    finally:
+        shutil.rmtree(work_dir)
+
+    wrong = []
+    for (category, courses) in fake.catalog.items():
+        for (number, fields) in courses[::2]:
+            course = course_map[f"{category} {number}"]
+            expected_grading = fields["SSR_CRSE_OFF_VW_GRADING_BASIS$0"].replace(
+                "Grad Ltr Grading", "Graduate Letter Grading")
+            if (course.units != fields["DERIVED_CRSECAT_UNITS_RANGE$0"]
+                    or course.gradingBasis != expected_grading
+                    or course.components != "Lecture, Discussion"
+                    or course.enrollmentRequirement != "Open to majors only"):
+                wrong.append(course.id)
+
+    server.shutdown()
+    print(f"{len(course_map)} courses over {fake.posts} posts, {len(wrong)} wrong", wrong[:5])
+
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(check())
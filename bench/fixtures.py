@@ -0,0 +1,351 @@
+import os
+import sys
+import json
+import html
+import random
+import hashlib
+import threading
+
+from datetime import datetime
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# pages shaped like the ones the scrapers in web.py read, generated at any
+# size, and a local server that stands in for every host they live on. the
+# generated pages can be replaced with recorded ones, see record()
+
+FIRST_NAMES = ["Ada", "Alan", "Barbara", "Claude", "Donald", "Edsger", "Frances",
+               "Grace", "John", "Leslie", "Margaret", "Niklaus", "Radia", "Tim"]
+LAST_NAMES = ["Allen", "Backus", "Dijkstra", "Hamilton", "Hopper", "Knuth", "Lamport",
+              "Liskov", "Lovelace", "Perlman", "Shannon", "Turing", "Wirth", "Zuse"]
+WORDS = ["algorithms", "data", "structures", "systems", "networks", "students",
+         "learn", "programming", "design", "analysis", "of", "the", "and", "with"]
+SEMESTERS = [("spring", "January"), ("summer", "June"), ("fall", "September"), ("winter", "December")]
+
+
+def page(title, body):
+    return (
+        f"<!DOCTYPE html>\n<html><head><title>{title}</title></head>\n"
+        f"<body>\n{body}\n</body></html>\n"
+    ).encode("utf-8")
+
+
+def sentence(rng, low=20, high=60):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+
+def make_staff(scale):
+    # (first, last, profile path or None) of every staff member
+    staff = []
+    for i in range(300 * scale):
+        first = FIRST_NAMES[i % len(FIRST_NAMES)]
+
+        # double barrelled last names keep every name unique, the directory
+        # does not allow digits in a name
+        parts = []
+        rest = i // len(FIRST_NAMES)
+        while True:
+            parts.append(LAST_NAMES[rest % len(LAST_NAMES)])
+            rest //= len(LAST_NAMES)
+            if not rest:
+                break
+        last = "-".join(parts)
+
+        profile = f"/people/{first.lower()}-{last.lower()}" if i % 3 else None
+        staff.append((first, last, profile))
+
+    return staff
+
+
+def cics_pages(rng, scale, staff):
+    # {url: page} of the CICS description pages iter_courses asks for, and
+    # the frequency table
+    pages = {}
+    current_year = int(datetime.now().year) % 2000 + 1
+    numbers = [str(100 + i) for i in range(60 * scale)]
+
+    for year in range(current_year, 17, -1):
+        for query_id in [7, 3]:
+            # next year's pages are generated like the others so the pages
+            # that follow stay the same, but like on the real site they are
+            # not there yet
+            sections = []
+            for number in rng.sample(numbers, len(numbers) // 2):
+                subject = rng.choice(["COMPSCI", "COMPSCI", "CICS", "INFO"])
+                instructors = ", ".join(
+                    f"{first} {last}" for (first, last, _) in rng.sample(staff, rng.randint(1, 3))
+                )
+                if rng.random() < 0.1:
+                    instructors += ", Staff"
+
+                description = sentence(rng)
+                if rng.random() < 0.6:
+                    description += f" Prerequisite: COMPSCI {rng.choice(numbers)}. 3 credits."
+
+                sections.append(
+                    f'<h2><a href="https://example.edu/{number}">{subject} {number}: '
+                    f'{html.escape(sentence(rng, 2, 5)[:-1])}</a></h2>\n'
+                    f'<h3>Instructor(s): {instructors}</h3>\n'
+                    f'<p>{description}</p>\n'
+                )
+
+            if year == current_year:
+                continue
+
+            pages[f"https://web.cs.umass.edu/csinfo/autogen/cicsdesc1{year}{query_id}.html"] = page(
+                "Course Descriptions",
+                '<div class="content"><h2>Course Descriptions</h2>\n' + "".join(sections) + "</div>"
+            )
+
+    rows = "".join(
+        f"<tr><td>COMPSCI</td><td>{number}</td><td>{rng.choice(['Fall', 'Spring', 'Fall and Spring'])}</td></tr>\n"
+        for number in numbers
+    )
+    pages["https://web.cs.umass.edu/csinfo/autogen/cmpscicoursesfull.html"] = page(
+        "Course Frequency",
+        f"<table><tr><th>Subject</th><th>Number</th><th>Frequency</th></tr>\n{rows}</table>"
+    )
+
+    return pages
+
+
+def math_pages(rng, scale):
+    pages = {}
+    numbers = [str(100 + i) for i in range(40 * scale)]
+    start = 100
+
+    options = "".join(f'<option value="{i}">Term {i}</option>' for i in range(start, start - 20, -1))
+    pages["https://www.math.umass.edu/course-descriptions"] = page(
+        "Course Descriptions",
+        f'<form><select id="edit-semester-tid" name="semester_tid">{options}</select></form>'
+    )
+
+    for i in range(start - 10, start + 1):
+        articles = []
+        for number in rng.sample(numbers, len(numbers) // 2):
+            subject = rng.choice(["MATH", "MATH", "STAT"])
+            prereq = (
+                f'<div class="field-course-descr-prereq">Prerequisites: MATH {rng.choice(numbers)}</div>'
+                if rng.random() < 0.7 else ""
+            )
+            articles.append(
+                '<article class="node-course-description">'
+                f'<div class="field-title">{subject} {number}: {sentence(rng, 2, 5)[:-1]}</div>'
+                f'<div class="field-course-descr-description">{sentence(rng)}</div>'
+                f'{prereq}</article>\n'
+            )
+
+        pages[f"https://www.math.umass.edu/course-descriptions?semester_tid={i}"] = page(
+            "Course Descriptions", '<div class="view-content">' + "".join(articles) + "</div>"
+        )
+
+    rows = "".join(
+        f"<tr><td>Math {number}</td><td>{rng.choice(['Fall', 'Spring', 'Fall/Spring', 'Fall/Spring/Summer'])}</td></tr>\n"
+        for number in numbers
+    )
+    pages["https://www.math.umass.edu/course-offerings"] = page(
+        "Course Offerings", f"<table><tr><td>Course</td><td>Frequency</td></tr>\n{rows}</table>"
+    )
+
+    return pages
+
+
+def staff_pages(rng, staff):
+    pages = {}
+    entries = []
+    for (i, (first, last, profile)) in enumerate(staff):
+        website = profile or f"https://example.edu/~{first.lower()}{i}"
+        location = (
+            '<div class="views-field views-field-field-location">'
+            f'<span class="field-content">CS {100 + i % 300}</span></div>'
+            if i % 4 else ""
+        )
+        entries.append(
+            '<div class="views-row">'
+            '<div class="views-field views-field-title">'
+            f'<span class="field-content"><a href="{website}">{last}, {first}</a></span></div>'
+            f'<div class="views-field views-field-field-position">{rng.choice(["Professor", "Lecturer", "Staff"])}</div>'
+            '<div class="views-field views-field-field-email">'
+            f'<a href="mailto:{first.lower()}{i}@example.edu">{first.lower()}{i}@example.edu</a></div>'
+            f'<div class="views-field views-field-field-phone">P: 413-545-{1000 + i % 9000}</div>'
+            f'{location}</div>\n'
+        )
+
+        if profile:
+            photo = f'<img src="https://example.edu/photos/{i}.jpg">' if i % 2 else ""
+            pages["https://www.cics.umass.edu" + profile] = page(
+                f"{first} {last}",
+                f'<h1 id="page-title">{first} {last}</h1>'
+                f'<div class="content"><div><div>{photo}</div></div><p>{sentence(rng)}</p></div>'
+            )
+
+    pages["https://www.cics.umass.edu/people/all-faculty-staff"] = page(
+        "All Faculty and Staff",
+        '<div class="view-content"><div class="clearfix">' + "".join(entries) + "</div></div>"
+    )
+
+    return pages
+
+
+def calendar_page(rng, scale):
+    sections = []
+    for year in range(2030 - 2 * scale, 2030):
+        for (season, month) in SEMESTERS:
+            rows = [
+                f"<tr><td>First day of classes</td><td>Monday</td><td>{month}</td><td>2</td></tr>",
+                f"<tr><td>Last day of classes</td><td>Friday</td><td>{month}</td><td>27</td></tr>",
+            ]
+            for _ in range(20):
+                rows.append(
+                    f"<tr><td>{sentence(rng, 2, 6)[:-1]}</td><td>Tuesday</td>"
+                    f"<td>{month}</td><td>{rng.randint(1, 28)}</td></tr>"
+                )
+
+            sections.append(
+                f"<h3>University {season.capitalize()} {year}</h3>\n"
+                f"<table>{''.join(rows)}</table>\n"
+            )
+
+    return {
+        "https://www.umass.edu/registrar/calendars/academic-calendar": page(
+            "Academic Calendar",
+            '<div class="field-items"><div class="field-item even">' + "".join(sections) + "</div></div>"
+        ),
+    }
+
+
+def make_site(scale=1, seed=0):
+    # {url: page content} for every url the scrapers fetch
+    rng = random.Random(seed)
+    staff = make_staff(scale)
+
+    site = {}
+    site.update(cics_pages(rng, scale, staff))
+    site.update(math_pages(rng, scale))
+    site.update(staff_pages(rng, staff))
+    site.update(calendar_page(rng, scale))
+
+    return site
+
+
+def record(fixture_dir):
+    # copies the pages in the http cache into a fixture directory, so a run
+    # against the real sites can be replayed by the benchmarks
+    import cache
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    index = {}
+    for entry in cache.entries():
+        content = cache.read(entry)
+        if content is None:
+            continue
+
+        name = hashlib.sha1(entry['url'].encode("utf-8")).hexdigest() + ".html"
+        with open(os.path.join(fixture_dir, name), "wb") as f:
+            f.write(content)
+        index[entry['url']] = name
+
+    with open(os.path.join(fixture_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+
+    return len(index)
+
+
+def load_recorded(fixture_dir):
+    with open(os.path.join(fixture_dir, "index.json"), "r", encoding="utf-8") as f:
+        index = json.load(f)
+
+    site = {}
+    for (url, name) in index.items():
+        with open(os.path.join(fixture_dir, name), "rb") as f:
+            site[url] = f.read()
+
+    return site
+
+
+def site_key(url):
+    parts = urlsplit(url)
+
+    return parts.netloc + parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def make_handler(pages):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def answer(self, with_body):
+            # pages carry an etag and are answered with a 304 when it matches
+            content = pages.get(self.path.lstrip("/"))
+            etag = None
+            if content is None:
+                status = 404
+                content = page("404 Not Found", "<h1>Not Found</h1>")
+            else:
+                etag = '"%s"' % hashlib.sha1(content).hexdigest()
+                status = 304 if self.headers.get("If-None-Match") == etag else 200
+
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+            if status == 304:
+                self.end_headers()
+                return
+
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            if with_body:
+                self.wfile.write(content)
+
+        def do_GET(self):
+            self.answer(True)
+
+        def do_HEAD(self):
+            self.answer(False)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class LocalAdapter(HTTPAdapter):
+    # sends every request to the stand-in server, keeping the original host
+    # and path in the path so the server knows which page was asked for
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        request.url = f"{self.base_url}/{site_key(request.url)}"
+
+        return super().send(request, **kwargs)
+
+
+def serve(site):
+    # starts the stand-in on a free port and routes the fetch session to it,
+    # returns the server so it can be shut down
+    pages = {site_key(url): content for (url, content) in site.items()}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(pages))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def route_session(session: requests.Session, base_url, pool_size):
+    adapter = LocalAdapter(base_url, pool_connections=8, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+if __name__ == "__main__":
+    # python bench/fixtures.py record DIR
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+    if len(sys.argv) == 3 and sys.argv[1] == "record":
+        print(f"{record(sys.argv[2])} pages recorded to {sys.argv[2]}")
+    else:
+        print("usage: python bench/fixtures.py record DIR")
@@ -0,0 +1,155 @@
+import os
+import sys
+import random
+import resource
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import web
+from records import Staff
+
+# memory held by the scraped courses and staff of a catalog with many
+# departments, as the dicts and sets they used to be and as records
+#
+#   python bench/memory.py [--departments=40] [--courses=300] [--terms=12]
+#
+# every variant is built in a process of its own so the peak rss of one does
+# not hide the other. the strings are built at runtime the way parsed ones
+# are, two equal strings from two pages are two objects
+
+FREQUENCIES = ["Fall", "Spring", "Fall and Spring", "Fall, Spring and Summer", "Unscheduled"]
+TITLES = ["Professor", "Associate Professor", "Assistant Professor", "Lecturer", "Staff"]
+WORDS = ["algorithms", "data", "structures", "systems", "networks", "students",
+         "learn", "programming", "design", "analysis", "of", "the", "and", "with"]
+
+
+def fresh(value: str) -> str:
+    # an equal string that is a new object, like one read out of a page
+    return "".join(list(value))
+
+
+def make_catalog(departments, courses, terms, seed=0):
+    # ([sections of every term page], [(name, title, email) of every staff member])
+    rng = random.Random(seed)
+    subjects = [f"DEPT{i:02}" for i in range(departments)]
+    staff = [(f"First{i} Last{i}", rng.choice(TITLES), f"person{i}@example.edu")
+             for i in range(departments * 20)]
+
+    pages = []
+    for _ in range(terms):
+        sections = []
+        for subject in subjects:
+            for number in rng.sample(range(100, 100 + courses), courses // 2):
+                sections.append((
+                    fresh(subject),
+                    f"{subject} {number}",
+                    " ".join(rng.choice(WORDS) for _ in range(4)),
+                    " ".join(rng.choice(WORDS) for _ in range(60)),
+                    [fresh(name) for (name, _, _) in rng.sample(staff, rng.randint(1, 3))],
+                    f"https://example.edu/{subject}/{number}" if rng.random() < 0.5 else "",
+                ))
+        pages.append(sections)
+
+    frequency = {f"{subject} {number}": fresh(rng.choice(FREQUENCIES))
+                 for subject in subjects for number in range(100, 100 + courses)}
+
+    return pages, frequency, staff
+
+
+def as_dicts(pages, frequency, staff):
+    # how iter_courses and retrieve_staff_information held them before
+    course_map = {}
+    for sections in pages:
+        for (course_subject, course_id, course_title, course_description,
+             session_staff, course_website) in sections:
+            if course_id in course_map:
+                for name in session_staff:
+                    course_map[course_id]['staff'].add(name)
+            else:
+                course = {
+                    'subject': course_subject,
+                    'id': course_id,
+                    'number': course_id.split()[1],
+                    'title': course_title,
+                    'description': course_description,
+                    'staff': set(session_staff),
+                }
+                if len(course_website) > 0:
+                    course['website'] = course_website
+
+                course_map[course_id] = course
+
+    for course in course_map.values():
+        course['staff'] = sorted(course['staff'])
+        if course['id'] in frequency:
+            course['frequency'] = frequency[course['id']]
+
+    staff_list = [
+        {'names': [name], 'title': fresh(title), 'email': email, 'website': "https://example.edu/"}
+        for (name, title, email) in staff
+    ]
+
+    return course_map, staff_list
+
+
+def as_records(pages, frequency, staff):
+    course_map = {}
+    for sections in pages:
+        web.merge_cics_sections(sections, course_map)
+
+    for course in course_map.values():
+        course.staff = sorted(course.staff)
+        course.frequency = frequency.get(course.id)
+
+    staff_list = [
+        Staff(names=[name], title=fresh(title), email=email, website="https://example.edu/")
+        for (name, title, email) in staff
+    ]
+
+    return course_map, staff_list
+
+
+def measure(variant, departments, courses, terms):
+    tracemalloc.start()
+    pages, frequency, staff = make_catalog(departments, courses, terms)
+    course_map, staff_list = {"dicts": as_dicts, "records": as_records}[variant](pages, frequency, staff)
+
+    # the pages are gone by the time the courses are written, only what the
+    # courses and staff hold on to is left
+    del pages, frequency
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{variant} {len(course_map)} {len(staff_list)} {held} {peak_rss}")
+
+
+def option(args, name, default):
+    for arg in args:
+        if arg.startswith(f"--{name}="):
+            return arg.split("=", 1)[1]
+
+    return default
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] in ("dicts", "records"):
+        measure(sys.argv[1], *map(int, sys.argv[2:]))
+        sys.exit(0)
+
+    args = sys.argv[1:]
+    size = [option(args, "departments", "40"), option(args, "courses", "300"), option(args, "terms", "12")]
+    print(f"{size[0]} departments, {size[1]} course numbers each, {size[2]} term pages")
+
+    results = {}
+    for variant in ["dicts", "records"]:
+        line = subprocess.run([sys.executable, __file__, variant, *size],
+                              capture_output=True, text=True, check=True).stdout.split()
+        (_, course_count, staff_count, held, peak_rss) = line
+        results[variant] = int(held)
+        print(f"  {variant:<8} {course_count:>7} courses {staff_count:>6} staff  "
+              f"held {int(held) / 1e6:8.1f}MB  peak rss {int(peak_rss) / 1e3:8.1f}MB")
+
+    print(f"  records hold {1 - results['records'] / results['dicts']:.0%} less")
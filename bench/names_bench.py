@@ -0,0 +1,133 @@
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from names import NameIndex, is_name_short_for
+
+# roughly the size of the CICS directory and the instructor names found on the
+# course pages today
+STAFF_COUNT = 250
+INSTRUCTOR_COUNT = 1500
+SYLLABLES = ["an", "bel", "cor", "da", "el", "fin", "gar", "ha", "is", "jo",
+             "ka", "lin", "mar", "ni", "or", "pe", "qu", "ra", "sa", "tor"]
+
+
+def make_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def make_roster(rng, staff_count):
+    staff_list = []
+    for position in range(staff_count):
+        name = f"{make_word(rng)} {make_word(rng)}"
+        if rng.random() < 0.2:
+            name = f"{make_word(rng)} {make_word(rng)} {make_word(rng)}"
+
+        names = [name]
+        if rng.random() < 0.05:
+            # a second name, like the aliases of the directory
+            names.append(f"{make_word(rng)} {name.split(' ')[-1]}")
+
+        staff_list.append({'_id': position, 'names': names})
+
+    return staff_list
+
+
+def make_instructors(rng, staff_list, count):
+    instructors = []
+    for _ in range(count):
+        words = rng.choice(staff_list)['names'][0].split(" ")
+        kind = rng.random()
+        if kind < 0.6:
+            instructors.append(" ".join(words))
+        elif kind < 0.8:
+            # shortened first name
+            instructors.append(" ".join([words[0][:3]] + words[1:]))
+        elif kind < 0.85:
+            # dropped middle name
+            instructors.append(f"{words[0]} {words[-1]}")
+        elif kind < 0.9:
+            # someone else with the same first or last name
+            other = make_word(rng)
+            instructors.append(f"{words[0]} {other}" if rng.random() < 0.5 else f"{other} {words[-1]}")
+        else:
+            instructors.append(f"{make_word(rng)} {make_word(rng)}")
+
+    return instructors
+
+
+def text_score(terms, names):
+    # the textScore of a $text search for terms, worked out the way mongo
+    # scores every string of an indexed field on its own
+    score = 0
+    for name in names:
+        tokens = re.findall(r"[^\W_]+", name.lower())
+        for term in set(tokens).intersection(terms):
+            count = tokens.count(term)
+            frequency = sum(1 / 2 ** i for i in range(count))
+            adjustment = 1.1 if name.lower() == term else 1
+            score += frequency * (0.5 * count / len(tokens) + 0.5) * adjustment
+
+    return score
+
+
+def find_best_match_for(staff_name, cursor):
+    for possible_staff in cursor:
+        if possible_staff['_score'] >= 1:
+            return possible_staff
+
+        for name in possible_staff['names']:
+            if is_name_short_for(name, staff_name):
+                return possible_staff
+
+
+def linear_lookup(staff_name, staff_list):
+    # what linking did before the index: find_one by name, then the $text
+    # aggregation (textScore over the number of names, best first) handed to
+    # find_best_match_for
+    for staff in staff_list:
+        if staff_name in staff['names']:
+            return staff
+
+    terms = set(re.findall(r"[^\W_]+", staff_name.lower()))
+    cursor = []
+    for staff in staff_list:
+        score = text_score(terms, staff['names'])
+        if score > 0:
+            cursor.append(dict(staff, _score=score / len(staff['names'])))
+
+    cursor.sort(key=lambda possible_staff: possible_staff['_score'], reverse=True)
+    match = find_best_match_for(staff_name, cursor)
+
+    return staff_list[match['_id']] if match else None
+
+
+def run(scale):
+    rng = random.Random(scale)
+    staff_list = make_roster(rng, STAFF_COUNT * scale)
+    instructors = make_instructors(rng, staff_list, INSTRUCTOR_COUNT * scale)
+
+    start = time.perf_counter()
+    index = NameIndex(staff_list)
+    indexed = [index.lookup(name) for name in instructors]
+    indexed_time = time.perf_counter() - start
+
+    # the linear scan is sampled at the larger sizes, it takes minutes otherwise
+    sample = instructors[:INSTRUCTOR_COUNT]
+    start = time.perf_counter()
+    linear = [linear_lookup(name, staff_list) for name in sample]
+    linear_time = (time.perf_counter() - start) * len(instructors) / len(sample)
+
+    mismatched = sum(1 for (a, b) in zip(indexed, linear) if a is not b)
+    print(f"{scale:>4}x  staff={len(staff_list):>6}  names={len(instructors):>7}  "
+          f"indexed={indexed_time:8.3f}s  linear~={linear_time:9.3f}s  "
+          f"mismatched={mismatched}")
+
+
+if __name__ == "__main__":
+    for scale in [1, 10, 100]:
+        run(scale)
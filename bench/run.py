@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# the stand-ins are set up before main and fetch are imported, they read these
+# on import
+os.environ.setdefault("MONGO_CONNECTION_STRING", "mongodb://localhost/DATABASE")
+# the stand-in is local, only the polite per-host rate would be measured otherwise
+os.environ.setdefault("FETCH_HOST_RATE", "1000000")
+
+import mongomock
+import pymongo
+
+import cache
+import discovery
+import fetch
+import main
+import text
+import web
+
+import fixtures
+
+# times every scraper against the local stand-in of the UMass sites and the
+# database passes against mongomock, at growing data sizes
+#
+#   python bench/run.py [--scales=1,10,100] [--recorded=DIR] [--mongo=URL]
+#                       [--save=PATH] [--compare=PATH] [--tolerance=0.25] [--slack=0.05]
+#
+# --recorded also runs the pages recorded with `bench/fixtures.py record`,
+# --save keeps the timings and --compare fails when a step got slower than a
+# saved run by more than the tolerance
+#
+# mongomock scans a whole collection for every update, which makes the
+# database steps quadratic. past MOCK_SCALE they are only run against a real
+# local server given with --mongo, whose "bench" database is dropped
+
+MOCK_SCALE = 10
+
+STEPS = ["scrape_courses", "retrieve_staff_information", "get_academic_schedule",
+         "prerequisite pass", "mongo writes", "link_courses_to_staff", "prerequisite graph"]
+
+
+def timed(results, step, f, *args):
+    start = time.perf_counter()
+    value = f(*args)
+    elapsed = time.perf_counter() - start
+
+    results[step] = {'seconds': elapsed, 'items': len(value) if value is not None else 0}
+
+    return value
+
+
+def run(site, client):
+    server, base_url = fixtures.serve(site)
+
+    # every page is fetched from the stand-in, never from the disk cache. the
+    # pages discovery finds are kept apart from those of real runs, and every
+    # run starts without any
+    cache.enabled = False
+    work_dir = tempfile.mkdtemp()
+    discovery.state_path = os.path.join(work_dir, "cics_pages.json")
+    fetch.close_session()
+    fixtures.route_session(fetch.get_session(), base_url, fetch.max_workers)
+
+    results = {}
+    try:
+        courses = timed(results, "scrape_courses", web.scrape_courses)
+        staff_list = timed(results, "retrieve_staff_information", web.retrieve_staff_information)
+        semesters = timed(results, "get_academic_schedule", web.get_academic_schedule)
+
+        courses = list(courses.values())
+        courses = timed(results, "prerequisite pass", lambda: list(text.clean_descriptions(courses)))
+
+        if client is None:
+            return results
+
+        client.drop_database("bench")
+        db = client["bench"]
+
+        def write_all():
+            documents = []
+            for (collection, records, key_of, projection) in [
+                (db.courses, courses, main.course_key, ['id']),
+                (db.staff, staff_list, main.staff_key, ['names']),
+                (db.semesters, semesters, main.semester_key, ['season', 'year']),
+            ]:
+                batch = [record.to_document() for record in records]
+                main.write_documents(collection, batch, False, key_of, projection)
+                documents.extend(batch)
+
+            return documents
+
+        timed(results, "mongo writes", write_all)
+        timed(results, "link_courses_to_staff", lambda: main.link_courses_to_staff(db.courses, db.staff)
+              or list(db.staff.find({'courses': {'$exists': True}}, {'_id': 1})))
+        timed(results, "prerequisite graph", lambda: main.build_prerequisites(db.courses, db.prerequisites, False)
+              or list(db.prerequisites.find({}, {'_id': 1})))
+    finally:
+        fetch.close_session()
+        server.shutdown()
+        shutil.rmtree(work_dir)
+
+    return results
+
+
+def report(size, site, results):
+    print(f"{size}  ({sum(len(content) for content in site.values()) / 1e6:.1f}MB of pages, "
+          f"parser {web.html_parser})")
+    for step in STEPS:
+        if step not in results:
+            print(f"  {step:<28} skipped, mongomock is too slow at this size, see --mongo")
+            continue
+
+        result = results[step]
+        print(f"  {step:<28} {result['seconds']:9.3f}s  {result['items']:>8} items")
+
+
+def compare(saved, measured, tolerance, slack):
+    # steps that got slower than the saved run by more than the tolerance,
+    # differences under slack seconds are noise
+    slower = []
+    for (size, results) in measured.items():
+        for (step, result) in results.items():
+            before = saved.get(size, {}).get(step)
+            if before and result['seconds'] > max(before['seconds'] * (1 + tolerance), before['seconds'] + slack):
+                slower.append(f"{size} {step}: {before['seconds']:.3f}s -> {result['seconds']:.3f}s")
+
+    return slower
+
+
+def option(args, name, default=None):
+    for arg in args:
+        if arg.startswith(f"--{name}="):
+            return arg.split("=", 1)[1]
+
+    return default
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    mongo_url = option(args, "mongo")
+
+    # (name, scale, pages)
+    sizes = [
+        (f"{scale}x", int(scale), fixtures.make_site(int(scale)))
+        for scale in option(args, "scales", "1,10,100").split(",")
+    ]
+    if recorded := option(args, "recorded"):
+        sizes.append(("recorded", 1, fixtures.load_recorded(recorded)))
+
+    measured = {}
+    for (size, scale, site) in sizes:
+        if mongo_url:
+            client = pymongo.MongoClient(mongo_url)
+        else:
+            client = mongomock.MongoClient() if scale <= MOCK_SCALE else None
+
+        measured[size] = run(site, client)
+        report(size, site, measured[size])
+
+        if client is not None:
+            client.drop_database("bench")
+            client.close()
+
+    if save_path := option(args, "save"):
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(measured, f, indent=2)
+
+    if compare_path := option(args, "compare"):
+        with open(compare_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+
+        slower = compare(saved, measured, float(option(args, "tolerance", "0.25")),
+                         float(option(args, "slack", "0.05")))
+        for line in slower:
+            print("slower:", line)
+
+        sys.exit(1 if slower else 0)
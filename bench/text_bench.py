@@ -0,0 +1,123 @@
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bs4 import BeautifulSoup
+
+import cache
+import text
+from records import Course
+
+# the text functions as they were before the text module, kept to compare with
+
+
+def old_clean_text(s: str):
+    for r in ['\xa0', '\n', '\t']:
+        s = s.replace(r, ' ')
+
+    while '  ' in s:
+        s = s.replace("  ", ' ')
+
+    return s.strip()
+
+
+def old_spire_clean(s: str):
+    for r in ["\n", "\t", "  "]:
+        s = s.replace(r, " ")
+
+    return s.strip()
+
+
+def old_reg_replace(match: str, pattern: str, replace: str, flags) -> str:
+    return re.sub(pattern, replace, match, flags=flags)
+
+
+def old_clean_course(course):
+    description = course['description']
+
+    prereq_match = re.search(r"(undergraduate)? prerequisite(s)?:.+", description, flags=re.I)
+    if prereq_match:
+        description = description.replace(prereq_match.group(), "")
+        course['enrollmentRequirement'] = old_reg_replace(
+            prereq_match.group(), r" \d credits(\.)?", "", flags=re.M | re.I)
+
+    course['description'] = old_reg_replace(description, r" \d credits\.", "", flags=re.M | re.I)
+
+    return course
+
+
+def recorded_texts():
+    # the raw text of every paragraph and heading of the pages in the http
+    # cache, the same strings the scrapers clean
+    texts = []
+    for entry in cache.entries():
+        content = cache.read(entry)
+        if not content:
+            continue
+
+        soup = BeautifulSoup(content, "html.parser")
+        texts.extend(elem.text for elem in soup.find_all(["p", "h2", "h3", "td", "div"]))
+
+    return texts
+
+
+def sample_texts(count=20000):
+    # stands in for recorded pages when the cache is empty, shaped like the
+    # paragraphs of the CICS description pages
+    rng = random.Random(0)
+    words = ["algorithms", "data", "structures", "systems", "the", "of", "and",
+             "students", "will", "learn", "programming", "design", "analysis"]
+    texts = []
+    for _ in range(count):
+        body = " ".join(rng.choice(words) for _ in range(rng.randint(20, 120)))
+        body = body.replace(" the ", "\n\t the\xa0 ")
+        if rng.random() < 0.5:
+            body += f"  Prerequisite: COMPSCI {rng.randint(100, 599)}. {rng.randint(1, 4)} credits."
+        texts.append(body)
+
+    return texts
+
+
+def timed(name, f, items, repeat=5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = [f(item) for item in items]
+        best = min(best, time.perf_counter() - start)
+
+    print(f"{name:<32} {best * 1000:9.2f}ms")
+
+    return result
+
+
+def main():
+    texts = recorded_texts()
+    source = "recorded pages"
+    if not texts:
+        texts = sample_texts()
+        source = "generated sample"
+
+    print(f"{len(texts)} strings from {source}")
+
+    old = timed("web.clean_text (old)", old_clean_text, texts)
+    new = timed("text.clean_text", text.clean_text, texts)
+    print("  same output:", old == new)
+
+    timed("spire.text_of (old)", old_spire_clean, texts)
+    timed("spire.text_of (text.clean_text)", text.clean_text, texts)
+
+    cleaned = [text.clean_text(s) for s in texts]
+    old = timed("prerequisite pass (old)", old_clean_course,
+                [{'description': s} for s in cleaned], repeat=1)
+    new = timed("text.clean_descriptions", text.clean_description,
+                [Course(description=s) for s in cleaned], repeat=1)
+    print("  same output:", old == [course.to_document() for course in new])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+# SETTINGS
+
+cache_dir = os.environ.get("CACHE_DIR", ".http_cache")
+# seconds a stored page is served without asking the server again, after that
+# it is revalidated with a conditional request
+ttl = int(os.environ.get("CACHE_TTL", "0"))
+max_size = int(os.environ.get("CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# only serve what is already on disk, never touch the network
+offline = os.environ.get("CACHE_OFFLINE", "FALSE").upper() == "TRUE"
+enabled = os.environ.get("CACHE", "TRUE").upper() == "TRUE"
+
+# STATE
+
+_lock = threading.Lock()
+_total_size = None
+
+
+def key_of(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def meta_path(key: str) -> str:
+    return os.path.join(cache_dir, key + ".json")
+
+
+def body_path(key: str) -> str:
+    return os.path.join(cache_dir, key + ".body")
+
+
+def write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+
+    os.replace(tmp_path, path)
+
+
+def write_meta(entry):
+    write_atomic(meta_path(entry['key']), json.dumps(entry).encode("utf-8"))
+
+
+def lookup(url: str):
+    if not enabled:
+        return None
+
+    key = key_of(url)
+    try:
+        with open(meta_path(key), "rb") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if entry.get('url') != url or not os.path.exists(body_path(key)):
+        return None
+
+    return entry
+
+
+def is_fresh(entry) -> bool:
+    return time.time() - entry['storedAt'] < ttl
+
+
+def read(entry):
+    try:
+        with open(body_path(entry['key']), "rb") as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    entry['usedAt'] = time.time()
+    write_meta(entry)
+
+    return content
+
+
+def conditional_headers(entry):
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+
+    return headers
+
+
+def revalidated(entry):
+    # the server answered 304, the stored body is good for another ttl
+    entry['storedAt'] = time.time()
+
+    return read(entry)
+
+
+def store(url: str, headers, content: bytes):
+    global _total_size
+
+    if not enabled:
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    key = key_of(url)
+    now = time.time()
+    entry = {
+        'key': key,
+        'url': url,
+        'etag': headers.get('ETag'),
+        'lastModified': headers.get('Last-Modified'),
+        'storedAt': now,
+        'usedAt': now,
+        'size': len(content),
+    }
+
+    with _lock:
+        previous = lookup(url)
+        write_atomic(body_path(key), content)
+        write_meta(entry)
+
+        if _total_size is not None:
+            _total_size += len(content) - (previous['size'] if previous else 0)
+
+    evict()
+
+
+def parsed_path(key: str) -> str:
+    return os.path.join(cache_dir, "parsed", key + ".json")
+
+
+def load_parsed(key: str):
+    if not enabled:
+        return None
+
+    try:
+        with open(parsed_path(key), "rb") as f:
+            records = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # the modification time is when the records were last used, for evict()
+    try:
+        os.utime(parsed_path(key))
+    except OSError:
+        pass
+
+    return records
+
+
+def store_parsed(key: str, records):
+    global _total_size
+
+    if not enabled:
+        return
+
+    os.makedirs(os.path.dirname(parsed_path(key)), exist_ok=True)
+    content = json.dumps(records).encode("utf-8")
+
+    with _lock:
+        try:
+            previous_size = os.path.getsize(parsed_path(key))
+        except OSError:
+            previous_size = 0
+        write_atomic(parsed_path(key), content)
+
+        if _total_size is not None:
+            _total_size += len(content) - previous_size
+
+    evict()
+
+
+def entries():
+    if not os.path.isdir(cache_dir):
+        return []
+
+    found = []
+    for file_name in os.listdir(cache_dir):
+        if not file_name.endswith(".json"):
+            continue
+
+        try:
+            with open(os.path.join(cache_dir, file_name), "rb") as f:
+                found.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    return found
+
+
+def parsed_entries():
+    # the stored parsed records, shaped like the entries of pages so they are
+    # counted and evicted along with them
+    parsed_dir = os.path.join(cache_dir, "parsed")
+    if not os.path.isdir(parsed_dir):
+        return []
+
+    found = []
+    for file_name in os.listdir(parsed_dir):
+        if not file_name.endswith(".json"):
+            continue
+
+        try:
+            stat = os.stat(os.path.join(parsed_dir, file_name))
+        except OSError:
+            continue
+
+        found.append({
+            'key': file_name[:-len(".json")],
+            'parsed': True,
+            'size': stat.st_size,
+            'usedAt': stat.st_mtime,
+        })
+
+    return found
+
+
+def remove(entry):
+    if entry.get('parsed'):
+        paths = [parsed_path(entry['key'])]
+    else:
+        paths = [meta_path(entry['key']), body_path(entry['key'])]
+
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def evict():
+    global _total_size
+
+    with _lock:
+        if _total_size is None:
+            _total_size = sum(entry['size'] for entry in entries() + parsed_entries())
+
+        if _total_size <= max_size:
+            return
+
+        # least recently used pages and parsed records go first
+        for entry in sorted(entries() + parsed_entries(), key=lambda e: e['usedAt']):
+            if _total_size <= max_size:
+                break
+
+            remove(entry)
+            _total_size -= entry['size']
@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import time
+import random
+import signal
+import threading
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+import metrics
+
+# the scraper as a long running process that refreshes every source into the
+# db on an interval of its own. the mongo client, the http session, the parse
+# pool and the spire clients stay open between refreshes, so a refresh only
+# costs the pages it fetches
+#
+#   python daemon.py db-name
+#
+# GET /health on the status port answers with the state of every source, it
+# is 503 while the last refresh of a source failed
+
+# SETTINGS
+
+# seconds between the starts of two refreshes of a source, 0 turns it off
+intervals = {
+    'semesters': float(os.environ.get("REFRESH_SEMESTERS_INTERVAL", str(60 * 60))),
+    'courses': float(os.environ.get("REFRESH_COURSES_INTERVAL", str(60 * 60 * 6))),
+    'staff': float(os.environ.get("REFRESH_STAFF_INTERVAL", str(60 * 60 * 24))),
+    'spire': float(os.environ.get("REFRESH_SPIRE_INTERVAL", str(60 * 60 * 24))),
+}
+# every interval is stretched or shrunk by up to this share, so the sources
+# drift apart instead of hitting the sites together
+jitter = float(os.environ.get("REFRESH_JITTER", "0.1"))
+# refreshes that may run at the same time
+max_running = int(os.environ.get("REFRESH_CONCURRENCY", "2"))
+# keep the spire browsers (or http sessions) open between refreshes
+warm_spire = os.environ.get("DAEMON_WARM_SPIRE", "TRUE").upper() == "TRUE"
+status_host = os.environ.get("DAEMON_STATUS_HOST", "127.0.0.1")
+status_port = int(os.environ.get("DAEMON_STATUS_PORT", "8089"))
+
+# CONSTANTS
+
+# the stages of main a refresh of a source runs. the courses keep their spire
+# fields from the checkpoint between spire refreshes, only new courses are
+# looked up. staff that changed are written without their courses, so a
+# staff refresh links them again
+SOURCE_STAGES = {
+    'semesters': ["semesters"],
+    'courses': ["courses", "spire", "link", "prerequisites"],
+    'staff': ["staff", "link"],
+    'spire': ["courses", "spire", "link", "prerequisites"],
+}
+# durations of the last refreshes kept for the status page
+HISTORY = 10
+
+# STATE
+
+_lock = threading.Lock()
+# refreshes running right now
+_running = 0
+# one lock per collection, a refresh holds the ones it writes
+_collection_locks = {name: threading.Lock() for name in main.COLLECTION_NAMES}
+
+
+class Source:
+    def __init__(self, name: str, interval: float, stages):
+        self.name = name
+        self.interval = interval
+        self.stages = stages
+        # the spire refresh visits every course whose fields are older than
+        # its interval, the others go by the checkpoint ttl
+        self.spire_max_age = interval if name == "spire" else None
+
+        self.running = False
+        self.next_run = time.time()
+        self.runs = 0
+        self.failures = 0
+        self.last_started = None
+        self.last_success = None
+        self.last_error = None
+        self.durations = deque(maxlen=HISTORY)
+
+    def collections(self):
+        # what a refresh writes, linking writes the staff and reads the courses
+        names = set(main.loaded_collections(self.stages))
+        if "link" in self.stages:
+            names.update(["courses", "staff"])
+
+        return sorted(names)
+
+    def schedule(self, started: float):
+        spread = random.uniform(-jitter, jitter)
+        self.next_run = started + self.interval * (1 + spread)
+
+    def status(self):
+        return {
+            'interval': self.interval,
+            'stages': self.stages,
+            'running': self.running,
+            'nextRun': self.next_run,
+            'runs': self.runs,
+            'failures': self.failures,
+            'lastStarted': self.last_started,
+            'lastSuccess': self.last_success,
+            'lastError': self.last_error,
+            'lastSeconds': self.durations[-1] if self.durations else None,
+            'seconds': list(self.durations),
+        }
+
+
+def make_sources():
+    sources = []
+    for (name, stages) in SOURCE_STAGES.items():
+        if intervals[name] <= 0:
+            continue
+
+        if intervals['spire'] <= 0:
+            stages = [stage for stage in stages if stage != "spire"]
+        sources.append(Source(name, intervals[name], stages))
+
+    return sources
+
+
+def refresh(db, source: Source, slots: threading.Semaphore, wake: threading.Event):
+    global _running
+
+    try:
+        with slots:
+            locks = [_collection_locks[name] for name in source.collections()]
+            for lock in locks:
+                lock.acquire()
+
+            try:
+                with _lock:
+                    # the metrics only cover the refreshes since the daemon was
+                    # last idle, they would grow without end otherwise
+                    if _running == 0:
+                        metrics.reset()
+                    _running += 1
+
+                started = time.time()
+                source.last_started = started
+                error = None
+                try:
+                    main.run(db, source.stages, incremental=True, spire_max_age=source.spire_max_age)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+
+                seconds = time.time() - started
+                with _lock:
+                    _running -= 1
+                    source.runs += 1
+                    source.durations.append(seconds)
+                    source.last_success = error is None
+                    source.last_error = error
+                    if error:
+                        source.failures += 1
+                    source.schedule(started)
+
+                if error:
+                    print(f"Refresh of {source.name} failed after {seconds:.1f}s:", error)
+                else:
+                    print(f"Refreshed {source.name} in {seconds:.1f}s")
+                metrics.write(success=error is None)
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+    finally:
+        source.running = False
+        wake.set()
+
+
+def status(db_name: str, started_at: float, sources):
+    return {
+        'db': db_name,
+        'startedAt': started_at,
+        'uptime': time.time() - started_at,
+        'healthy': all(source.last_success is not False for source in sources),
+        'sources': {source.name: source.status() for source in sources},
+    }
+
+
+def make_handler(get_status):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/health"):
+                self.send_error(404)
+                return
+
+            with _lock:
+                current = get_status()
+            content = json.dumps(current, indent=2).encode("utf-8")
+
+            self.send_response(200 if current['healthy'] else 503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(args):
+    if len(args) != 2:
+        print("Please supply a db-name.")
+        return
+
+    from pymongo import MongoClient
+
+    import fetch
+    import web
+
+    sources = make_sources()
+    if not sources:
+        print("Every source is turned off.")
+        return
+
+    started_at = time.time()
+    client = MongoClient(os.environ['MONGO_CONNECTION_STRING'].replace("DATABASE", args[1]))
+    db = client[args[1]]
+
+    # set up once here rather than by the first refreshes, side by side
+    fetch.get_session()
+    web.get_parse_pool()
+    spire = None
+    if warm_spire and intervals['spire'] > 0:
+        import spire
+
+        spire.keep_warm = True
+
+    server = ThreadingHTTPServer(
+        (status_host, status_port),
+        make_handler(lambda: status(args[1], started_at, sources))
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Refreshing {', '.join(source.name for source in sources)} into {args[1]}, "
+          f"status on http://{status_host}:{server.server_address[1]}/health")
+
+    stopping = threading.Event()
+    wake = threading.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: (stopping.set(), wake.set()))
+
+    slots = threading.Semaphore(max_running)
+    threads = []
+    try:
+        while not stopping.is_set():
+            now = time.time()
+            for source in sources:
+                if not source.running and source.next_run <= now:
+                    source.running = True
+                    thread = threading.Thread(target=refresh, args=(db, source, slots, wake))
+                    thread.start()
+                    threads.append(thread)
+
+            threads = [thread for thread in threads if thread.is_alive()]
+
+            idle = [source.next_run for source in sources if not source.running]
+            wake.wait(max(0.0, min(idle) - time.time()) if idle else None)
+            wake.clear()
+    finally:
+        print("Stopping, waiting for the running refreshes")
+        for thread in threads:
+            thread.join()
+
+        server.shutdown()
+        web.close_parse_pool()
+        fetch.close_session()
+        if spire:
+            spire.close_warm()
+        client.close()
+
+
+if __name__ == "__main__":
+    serve(sys.argv)
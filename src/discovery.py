@@ -0,0 +1,104 @@
+import os
+import json
+import threading
+
+from datetime import datetime
+
+import cache
+import fetch
+
+# which CICS description pages exist, kept across runs so a run only asks
+# about the pages of recent terms. a page is final once its term is more than
+# final_age years old:
+#   a final page that is in the http cache is read from it, never fetched
+#   a final page that was missing is never asked for again
+# a page of a later term is revalidated while it exists, and probed with a
+# head while it is missing or unknown. a run then costs about the same no
+# matter how many years the catalog goes back
+
+# SETTINGS
+
+state_path = os.environ.get("CICS_PAGE_STATE", ".cics_pages.json")
+final_age = int(os.environ.get("CICS_FINAL_AGE", "1"))
+enabled = os.environ.get("CICS_PAGE_STATE_ENABLED", "TRUE").upper() == "TRUE"
+
+# CONSTANTS
+
+# statuses a page is missing with, any other answer means it is there
+MISSING = (404, 410)
+
+# STATE
+
+_lock = threading.Lock()
+
+
+def load():
+    # {url: "live" | "missing"} of the pages seen by earlier runs
+    if not enabled:
+        return {}
+
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f).get('pages', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save(known):
+    if not enabled:
+        return
+
+    with _lock:
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({'pages': known}, f, indent=2, sort_keys=True)
+
+        os.replace(tmp_path, state_path)
+
+
+def is_final(year: int) -> bool:
+    # year is the two digit year of the term
+    return datetime.now().year - (2000 + year) > final_age
+
+
+def discover(pages):
+    # (urls to scrape, the final ones among them) out of [(url, year)], in
+    # the order given. live pages go straight to the scrape, missing and
+    # unknown ones are probed side by side first
+    if not enabled:
+        return [url for (url, _) in pages], set()
+
+    known = load()
+    final = set()
+    probed = []
+    for (url, year) in pages:
+        status = known.get(url)
+        if status == "missing":
+            if not is_final(year):
+                probed.append(url)
+        elif status == "live":
+            if is_final(year) and cache.lookup(url):
+                final.add(url)
+        else:
+            probed.append(url)
+
+    if cache.offline:
+        # an offline replay asks nothing, every page not known to be missing
+        # is read from the cache
+        probed = []
+
+    for (url, status) in fetch.probe_all(probed):
+        # an unknown page that went unanswered is left to the scrape, a
+        # missing one stays missing
+        if status in MISSING:
+            known[url] = "missing"
+        elif status is not None:
+            known[url] = "live"
+
+    save(known)
+
+    urls = [url for (url, _) in pages if known.get(url) != "missing"]
+    print(f"CICS pages: {len(urls)} of {len(pages)} scraped, {len(final)} of them final, "
+          f"{len(probed)} probed")
+
+    return urls, final
@@ -0,0 +1,258 @@
+import os
+import time
+import random
+import threading
+
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import cache
+import metrics
+
+# SETTINGS
+
+max_workers = int(os.environ.get("FETCH_WORKERS", "8"))
+# requests in flight to one host at a time
+host_concurrency = int(os.environ.get("FETCH_HOST_CONCURRENCY", "4"))
+# requests started per second and host. the rate backs off by half whenever a
+# host throttles or times out and creeps back up by rate_step on success
+max_rate = float(os.environ.get("FETCH_HOST_RATE", "20"))
+min_rate = 0.5
+rate_step = 0.5
+# seconds to connect and to wait for the next bytes of an answer
+timeout = (
+    float(os.environ.get("FETCH_CONNECT_TIMEOUT", "10")),
+    float(os.environ.get("FETCH_READ_TIMEOUT", "30")),
+)
+# retries of a page after a timeout, a dropped connection or a 5xx answer,
+# waiting a random time up to backoff * 2 ** attempt before each
+retries = int(os.environ.get("FETCH_RETRIES", "3"))
+backoff = float(os.environ.get("FETCH_BACKOFF", "0.5"))
+max_backoff = 30
+# pages in a row that failed every retry after which a host is not asked
+# again for a while
+breaker_failures = int(os.environ.get("FETCH_BREAKER_FAILURES", "5"))
+breaker_cooldown = float(os.environ.get("FETCH_BREAKER_COOLDOWN", "60"))
+
+# CONSTANTS
+
+# answers that mean the host is overloaded or asks us to slow down
+THROTTLED = (429, 503)
+RETRIED = (429, 500, 502, 503, 504)
+
+# STATE
+
+_session = None
+_session_lock = threading.Lock()
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+class Host:
+    # limits the requests sent to one host and trips a circuit breaker once
+    # the host keeps failing, every fetch thread to the host shares it
+
+    def __init__(self):
+        self.slots = threading.Semaphore(host_concurrency)
+        self.lock = threading.Lock()
+        self.rate = max_rate
+        self.next_start = 0
+        self.failures = 0
+        self.open_until = 0
+
+    def wait_turn(self):
+        # spaces the starts of requests 1 / rate seconds apart
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + 1 / self.rate
+
+        time.sleep(start - now)
+
+    def is_open(self) -> bool:
+        # once the cooldown is over requests go through again, a single
+        # failed page opens the breaker again until one of them succeeds
+        return time.monotonic() < self.open_until
+
+    def succeeded(self):
+        with self.lock:
+            self.failures = 0
+            self.rate = min(max_rate, self.rate + rate_step)
+
+    def attempt_failed(self, throttled: bool):
+        if throttled:
+            with self.lock:
+                self.rate = max(min_rate, self.rate / 2)
+
+    def page_failed(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= breaker_failures:
+                self.open_until = time.monotonic() + breaker_cooldown
+
+
+def host_of(url: str) -> Host:
+    name = urlsplit(url).netloc
+    with _hosts_lock:
+        if name not in _hosts:
+            _hosts[name] = Host()
+
+        return _hosts[name]
+
+
+def get_session() -> requests.Session:
+    global _session
+
+    # the courses, staff and semesters ask for it from threads of their own
+    with _session_lock:
+        if _session is None:
+            # keep-alive connections are pooled per host by the adapter, size
+            # the pool so every worker can hold its own connection to the same host
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max_workers)
+
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+
+        return _session
+
+
+def close_session():
+    global _session
+
+    with _session_lock:
+        session = _session
+        _session = None
+
+    if session is not None:
+        session.close()
+
+
+def retry_delay(attempt: int, res) -> float:
+    delay = random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+
+    retry_after = res.headers.get("Retry-After", "") if res is not None else ""
+    if retry_after.isdigit():
+        delay = max(delay, min(max_backoff, int(retry_after)))
+
+    return delay
+
+
+def request(url: str, headers, method="GET"):
+    # the answer to a get (or head) of url, or None with the reason once the
+    # retries are used up or the host's breaker is open
+    host = host_of(url)
+    reason = None
+
+    for attempt in range(retries + 1):
+        if host.is_open():
+            return None, reason or "circuit open"
+
+        res = None
+        with host.slots:
+            host.wait_turn()
+            try:
+                res = get_session().request(method, url, headers=headers, timeout=timeout)
+            except requests.Timeout:
+                reason = "timed out"
+                host.attempt_failed(throttled=True)
+            except requests.RequestException as e:
+                reason = type(e).__name__
+                host.attempt_failed(throttled=False)
+
+        if res is not None:
+            if res.status_code not in RETRIED:
+                host.succeeded()
+                return res, None
+
+            reason = f"status {res.status_code}"
+            host.attempt_failed(throttled=res.status_code in THROTTLED)
+
+        if attempt < retries:
+            time.sleep(retry_delay(attempt, res))
+
+    host.page_failed()
+
+    return None, reason
+
+
+def fetch_page(url: str, final=False):
+    # (content, status, source) where source is where the content came from,
+    # "cache", "revalidated", "network", "stale" or "skipped". a final page
+    # can not change anymore, a stored copy is used without asking the server
+    entry = cache.lookup(url)
+    if entry and (cache.offline or final or cache.is_fresh(entry)):
+        return cache.read(entry), 200, "cache"
+
+    if cache.offline:
+        metrics.record_skip(url, "not in the cache")
+        return None, None, "skipped"
+
+    res, reason = request(url, cache.conditional_headers(entry))
+    if res is None:
+        # a stale copy is better than nothing when the host is unreachable
+        if entry:
+            return cache.read(entry), None, "stale"
+
+        metrics.record_skip(url, reason)
+        return None, None, "skipped"
+
+    if res.status_code == 304 and entry:
+        return cache.revalidated(entry), 304, "revalidated"
+
+    if not 200 <= res.status_code < 300:
+        # a missing or forbidden page has nothing the parsers could read
+        metrics.record_skip(url, f"status {res.status_code}")
+        return None, res.status_code, "skipped"
+
+    if res.status_code == 200:
+        cache.store(url, res.headers, res.content)
+
+    return res.content, res.status_code, "network"
+
+
+def fetch(url: str, final=False):
+    start = time.perf_counter()
+    content, status, source = fetch_page(url, final)
+    metrics.record_request(
+        url, status, source, len(content) if content else 0, time.perf_counter() - start
+    )
+
+    return content
+
+
+def fetch_all(urls, final=()):
+    # yields (url, content) pairs in the order the requests finish, the urls
+    # in final are pages that can not change anymore
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch, url, url in final): url for url in urls}
+
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def probe(url: str):
+    # the status a head of url is answered with, None if it went unanswered.
+    # nothing is cached, a probe only tells whether a page is there. offline
+    # replays ask nothing
+    if cache.offline:
+        return None
+
+    start = time.perf_counter()
+    res, _ = request(url, {}, "HEAD")
+    status = res.status_code if res is not None else None
+    metrics.record_request(url, status, "probe", 0, time.perf_counter() - start)
+
+    return status
+
+
+def probe_all(urls):
+    # yields (url, status) pairs in the order the probes finish
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(probe, url): url for url in urls}
+
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -1,143 +1,382 @@
 import sys
 import os
+import json
+import hashlib
 
-import pymongo
-from pymongo import MongoClient
+import metrics
+import prereqs
+import snapshot
+import text
+from names import NameIndex, aliases
+from records import Course, Staff, Semester
+from pipeline import Pipeline, batched
 
-import re
-import spire
-import web
+# pymongo, spire (selenium) and web (bs4, html5lib, requests) are only
+# imported once a run is known to need them, a run of a cheap stage like
+# semesters should not wait on what it does not use
 
+# SETTINGS
+
+# documents written to mongo per round trip
+write_batch_size = int(os.environ.get("WRITE_BATCH_SIZE", "500"))
+# a --staged run loads into collections with this suffix and renames them
+# over the live ones once they are complete
+staging_suffix = os.environ.get("STAGING_SUFFIX", "_staging")
+
+# CONSTANTS
+
+COLLECTION_NAMES = ["semesters", "courses", "staff", "prerequisites"]
+# every stage of a run, in the order they run in
+STAGES = ["courses", "spire", "staff", "semesters", "link", "prerequisites"]
+# the collection a stage loads
+STAGE_COLLECTIONS = {
+    'courses': "courses",
+    'staff': "staff",
+    'semesters': "semesters",
+    'prerequisites': "prerequisites",
+}
+# stages that scrape, the others work on what is in the db
+SCRAPING_STAGES = ["courses", "staff", "semesters"]
+# stages that only work on the db
+DB_STAGES = ["link", "prerequisites"]
+
+
+def link_courses_to_staff(course_collection, staff_collection):
+    # resolves every instructor name in memory against one read of the staff
+    # collection, then writes all of the course lists in a single bulk write
+    from pymongo import UpdateOne
+
+    staff_list = list(staff_collection.find({}, {'names': 1, 'courses': 1}))
+    name_index = NameIndex(staff_list, aliases)
+
+    staff_courses = {}
+    for course in course_collection.find({'staff': {'$exists': True}}, {'id': 1, 'staff': 1}):
+        for staff_name in course['staff']:
+            staff = name_index.lookup(staff_name)
+            if staff:
+                courses = staff_courses.setdefault(staff['_id'], [])
+                if course['id'] not in courses:
+                    courses.append(course['id'])
+
+    operations = []
+    for staff in staff_list:
+        if staff['_id'] in staff_courses:
+            operations.append(UpdateOne(
+                {'_id': staff['_id']},
+                {'$set': {'courses': staff_courses[staff['_id']]}}
+            ))
+        elif 'courses' in staff:
+            operations.append(UpdateOne(
+                {'_id': staff['_id']},
+                {'$unset': {'courses': ""}}
+            ))
+
+    if operations:
+        with metrics.timed("mongo link"):
+            staff_collection.bulk_write(operations, ordered=False)
+        metrics.count_documents(staff_collection.name + ".courses", len(operations))
+
+
+def build_prerequisites(course_collection, prerequisite_collection, incremental):
+    # the graph is built again from every course in the db, a changed
+    # requirement can move the closures of many courses
+    courses = course_collection.find({}, {'_id': 0, 'id': 1, 'enrollmentRequirement': 1})
+    documents = prereqs.build(courses)
+
+    write_documents(prerequisite_collection, documents, incremental, course_key, ['id'])
+
+
+def content_hash(document) -> str:
+    encoded = json.dumps(document, sort_keys=True, default=str)
+
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def course_key(course):
+    return {'id': course['id']}
+
+
+def staff_key(staff):
+    return {'names.0': staff['names'][0]}
+
+
+def semester_key(semester):
+    return {'season': semester['season'], 'year': semester['year']}
+
+
+def upsert_changed(collection, documents, key_of, projection):
+    # writes only the documents that are new or changed since the last run,
+    # returns how many were written and the keys that were not scraped again
+    from pymongo import ReplaceOne
+
+    stored = {}
+    for document in collection.find({}, projection + ['contentHash']):
+        key = tuple(sorted(key_of(document).items()))
+        stored[key] = document.get('contentHash')
+
+    written = 0
+    for batch in batched(documents, write_batch_size):
+        operations = []
+        for document in batch:
+            key_filter = key_of(document)
+            key = tuple(sorted(key_filter.items()))
+            document_hash = content_hash(document)
+
+            if stored.pop(key, None) != document_hash:
+                operations.append(ReplaceOne(
+                    key_filter,
+                    {**document, 'contentHash': document_hash},
+                    upsert=True
+                ))
+
+        if operations:
+            with metrics.timed(f"mongo {collection.name}"):
+                collection.bulk_write(operations, ordered=False)
+            metrics.count_documents(collection.name, len(operations))
+            written += len(operations)
 
-def is_name_short_for(a: str, b: str):
-    a_words = a.split(" ")
-    b_words = b.split(" ")
+    return written, [dict(key) for key in stored]
 
-    if b_words[0].find(a_words[0]) == 0 or a_words[0].find(b_words[0]) == 0:
-        b_remaining = set(b_words[1:])
-        a_remaining = set(a_words[1:])
- 
-        return b_remaining.issubset(a_remaining) or a_remaining.issubset(b_remaining)
 
+def write_documents(collection, documents, incremental, key_of, projection):
+    if not incremental:
+        for batch in batched(documents, write_batch_size):
+            with metrics.timed(f"mongo {collection.name}"):
+                collection.insert_many(batch, ordered=False)
+            metrics.count_documents(collection.name, len(batch))
+        return
 
-def find_best_match_for(staff_name: str, cursor):
-    for possible_staff in cursor:
-        if possible_staff['_score'] >= 1:
-            return possible_staff
-
-        for name in possible_staff['names']:
-            if is_name_short_for(name, staff_name):
-                return possible_staff
-
-
-def add_course_to_staff(staff_collection, course_staff, course_id):
-    for staff_name in course_staff:
-        staff = staff_collection.find_one({
-            "names": {"$in": [staff_name]}
-        })
-
-        if not staff:
-            cursor = staff_collection.aggregate([
-                {"$match": {"$text": {"$search": staff_name}}},
-                {
-                    "$project": {
-                        "_score": {"$divide": [{"$meta": "textScore"}, {"$size": "$names"}]},
-                        "names": 1,
-                    }
-                },
-                {"$sort": {"_score": -1}},
-            ])
+    written, removed = upsert_changed(collection, documents, key_of, projection)
+    print(f"{collection.name}: {written} new or changed")
+    if removed:
+        print(f"{collection.name}: no longer scraped", removed)
+
+
+def swap_in(db, names):
+    # renames every staging collection over its live one. each rename is
+    # atomic, readers see either the old or the new complete collection
+    for name in names:
+        with metrics.timed("mongo swap"):
+            db[name + staging_suffix].rename(name, dropTarget=True)
+
+
+def pop_option(args, name):
+    # removes "name value" from args, returns the value, or None if the
+    # option was not given, or "" if it was given without a value
+    if name not in args:
+        return None
+
+    position = args.index(name)
+    value = args[position + 1] if position + 1 < len(args) else ""
+    del args[position:position + 2]
+
+    return value
+
+
+def loaded_collections(stages):
+    # the collections a run of these stages loads, the others are only read
+    return [STAGE_COLLECTIONS[name] for name in stages if name in STAGE_COLLECTIONS]
+
+
+def is_scraping(stages, from_snapshot):
+    return any(name in SCRAPING_STAGES for name in stages) and not from_snapshot
+
+
+def run(db, stages, incremental=False, staged=False, snapshot_out=None, from_snapshot=None,
+        spire_max_age=None):
+    # runs the stages into db, or only into the snapshot when db is None.
+    # the parse pool, the http session and db are left open for the caller
+    # spire_max_age is how old (in seconds) the checkpointed spire fields of
+    # a course may be before it is visited again, the checkpoint ttl if None
+    loaded = loaded_collections(stages)
+    scraping = is_scraping(stages, from_snapshot)
+
+    if scraping:
+        import web
+
+        web.memoize_pages = incremental
+
+    semester_collection = course_collection = staff_collection = prerequisite_collection = None
+    if db is not None:
+        suffix = ""
+        if staged:
+            suffix = staging_suffix
+            # left behind by a staged run that failed
+            for name in loaded:
+                db.drop_collection(name + suffix)
+
+        def collection(name):
+            return db[name + suffix if name in loaded else name]
+
+        semester_collection = collection("semesters")
+        course_collection = collection("courses")
+        staff_collection = collection("staff")
+        prerequisite_collection = collection("prerequisites")
+
+    writer = snapshot.SnapshotWriter(snapshot_out) if snapshot_out else None
+
+    def store(kind, records, collection, key_of, projection):
+        # records only turn into documents here, on their way out
+        documents = (record.to_document() for record in records)
+        if writer:
+            documents = writer.tee(kind, documents)
+
+        if collection is None:
+            # only scraping into the snapshot
+            for _ in documents:
+                pass
+        else:
+            write_documents(collection, documents, incremental, key_of, projection)
+
+    pipeline = Pipeline()
+
+    if from_snapshot:
+        # the snapshot holds the courses as they were after cleanup and spire
+        course_source = lambda: map(Course.from_document, snapshot.read(from_snapshot, "course"))
+        staff_source = lambda: map(Staff.from_document, snapshot.read(from_snapshot, "staff"))
+        semester_source = lambda: map(Semester.from_document, snapshot.read(from_snapshot, "semester"))
+    elif scraping:
+        # retrieve course information from CICS and Math department websites,
+        # staff information from the CICS website and the academic calendar
+        course_source = web.iter_courses
+        staff_source = web.retrieve_staff_information
+        semester_source = web.get_academic_schedule
+
+    if "courses" in stages:
+        courses = pipeline.stage("courses", course_source)
+        if not from_snapshot:
+            # courses flow through description cleanup and spire into the db
+            courses = pipeline.stage("cleanup", text.clean_descriptions, courses)
+            if "spire" in stages:
+                # get sections, staff, and additional course information from spire
+                import spire
+
+                courses = pipeline.stage("spire", lambda items: spire.enrich(items, spire_max_age), courses)
+
+        pipeline.sink("course writes", lambda items: store(
+            "course", items, course_collection, course_key, ['id']
+        ), courses)
+    if "staff" in stages:
+        pipeline.task("staff", lambda: store(
+            "staff", staff_source(), staff_collection, staff_key, ['names']
+        ))
+    if "semesters" in stages:
+        pipeline.task("semesters", lambda: store(
+            "semester", semester_source(), semester_collection, semester_key, ['season', 'year']
+        ))
+
+    try:
+        pipeline.join()
+
+        if writer:
+            writer.close()
+            print(f"Snapshot {snapshot_out}:", writer.counts)
+
+        if db is not None:
+            from pymongo import TEXT
+
+            with metrics.stage("indexes"):
+                if "courses" in stages:
+                    course_collection.create_index([("id", TEXT)])
+                if "staff" in stages:
+                    staff_collection.create_index([("names", TEXT)])
+
+            if "link" in stages:
+                with metrics.stage("link"):
+                    link_courses_to_staff(course_collection, staff_collection)
+
+            if "prerequisites" in stages:
+                with metrics.stage("prerequisites"):
+                    # a staging collection starts out empty, the live one
+                    # is kept up to date
+                    build_prerequisites(course_collection, prerequisite_collection, not staged)
+                    prerequisite_collection.create_index("id", unique=True)
+                    prerequisite_collection.create_index("allPrerequisites")
+
+            if staged:
+                swap_in(db, loaded)
+    except BaseException:
+        if writer:
+            writer.close(complete=False)
+        raise
 
-            staff = find_best_match_for(staff_name, cursor)
 
-        if staff:
-            operation = {
-                    '$push': {
-                        'courses': course_id
-                    }
-                } if 'courses' in staff else {
-                    '$set': {
-                        'courses': [course_id]
-                    }
-                }
+def main(args):
+    # --stages courses,spire,staff,semesters,link,prerequisites only runs the
+    # given stages, every stage is run when it is left out. courses writes
+    # the courses, spire adds the additional course information from spire to
+    # them, link links the courses in the db to the staff teaching them and
+    # prerequisites builds the prerequisite graph of the courses in the db
+    # --no-spire is the same as leaving spire out of --stages
+    # --incremental only writes what changed since the last run into the db
+    # --staged loads, indexes and links staging collections and only then
+    # swaps them in for the live ones
+    # --snapshot-out PATH also writes everything scraped to a snapshot, the
+    # db-name can be left out to only scrape
+    # --from-snapshot PATH loads a snapshot instead of scraping
+    args = list(args)
+    snapshot_out = pop_option(args, "--snapshot-out")
+    from_snapshot = pop_option(args, "--from-snapshot")
+    stage_list = pop_option(args, "--stages")
+    incremental = "--incremental" in args
+    staged = "--staged" in args
+    stages = STAGES if stage_list is None else [name.strip() for name in stage_list.split(",")]
+    if "--no-spire" in args:
+        stages = [name for name in stages if name != "spire"]
+    args = [arg for arg in args if arg not in ("--incremental", "--no-spire", "--staged")]
+
+    if snapshot_out == "" or from_snapshot == "":
+        print("Please supply a snapshot path.")
+        return
 
-            staff_collection.update_one({
-                '_id': staff['_id']
-            }, operation)
+    if unknown := [name for name in stages if name not in STAGES]:
+        print(f"Unknown stage {', '.join(unknown)}, the stages are {', '.join(STAGES)}.")
+        return
 
+    if "spire" in stages and "courses" not in stages:
+        print("The spire stage adds to the scraped courses, it needs the courses stage.")
+        return
 
-def reg_replace(match: str, pattern: str, replace: str, flags) -> str:
-    return re.sub(
-        pattern,
-        replace,
-        match,
-        flags=flags
-    )
+    if len(args) != 2 and not (len(args) == 1 and snapshot_out):
+        print("Please supply a db-name.")
+        return
 
+    if len(args) != 2 and stage_list is not None and (
+            db_stages := [name for name in stages if name in DB_STAGES]):
+        print(f"The {', '.join(db_stages)} stage works on the db, it needs a db-name.")
+        return
 
-def main(args):
-    if len(args) != 2:
-        print("Please supply a db-name.")
+    if staged and incremental:
+        print("--staged loads every document, it can not be combined with --incremental.")
         return
 
-    client = MongoClient(os.environ['MONGO_CONNECTION_STRING'].replace("DATABASE", args[1]))
-    db = client[args[1]]
-    semester_collection = db.semesters
-    course_collection = db.courses
-    staff_collection = db.staff
-
-    # retrieve course information from CICS and Math department websites
-    course_map = web.scrape_courses()
-    
-    # use course description pre reqs
-    for (_, course) in course_map.items():
-        description = course['description']
-
-        prereq_match = re.search(
-            r"(undergraduate)? prerequisite(s)?:.+",
-            description,
-            flags=re.I
-        )
-
-        if prereq_match:
-            description = description.replace(prereq_match.group(), "")
-
-            course['enrollmentRequirement'] = reg_replace(
-                prereq_match.group(),
-                r" \d credits(\.)?",
-                "",
-                flags=re.M | re.I
-            )
-
-        course['description'] = reg_replace(
-            description,
-            r" \d credits\.",
-            "",
-            flags=re.M | re.I
-        )
-
-    # get sections, staff, and additional course information from spire
-    spire.scrape_additional_course_information(course_map)
-
-    # push information into db
-    course_collection.insert_many(course_map.values())
-    course_map = None
-
-    # retrieve staff information from CICS website and push
-    staff_collection.insert_many(web.retrieve_staff_information())
-    # retrieve course information and push
-    semester_collection.insert_many(web.get_academic_schedule())
-
-    course_collection.create_index([("id", pymongo.TEXT)])
-    staff_collection.create_index([("names", pymongo.TEXT)])
-
-    for course in course_collection.find():
-        if "staff" not in course:
-            continue
-
-        add_course_to_staff(staff_collection, course['staff'], course['id'])
-
-    client.close()
+    client = None
+    db = None
+    if len(args) == 2:
+        from pymongo import MongoClient
+
+        client = MongoClient(os.environ['MONGO_CONNECTION_STRING'].replace("DATABASE", args[1]))
+        db = client[args[1]]
+
+    try:
+        run(db, stages, incremental, staged, snapshot_out, from_snapshot)
+    except BaseException:
+        metrics.write(success=False)
+        raise
+    finally:
+        if is_scraping(stages, from_snapshot):
+            import web
+
+            web.close_parse_pool()
+        if client:
+            client.close()
+
+        if metrics.skipped:
+            print(f"Skipped {len(metrics.skipped)} pages, what they hold is missing from this run:")
+            for (url, reason) in metrics.skipped:
+                print(f"  {url}: {reason}")
+
+    metrics.write()
 
 
 if __name__ == "__main__":
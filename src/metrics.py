@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import inspect
+import functools
+import threading
+
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# SETTINGS
+
+# where the json report and the prometheus textfile of a run are written,
+# nothing is written when they are not set
+report_path = os.environ.get("METRICS_REPORT")
+textfile_path = os.environ.get("METRICS_TEXTFILE")
+
+# CONSTANTS
+
+# upper bounds in seconds of the timing histogram buckets
+TIMING_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60]
+# where a fetched page came from, the first two count as cache hits. the
+# others are "network", "stale" and "skipped", and "probe" for a head request
+CACHE_HITS = ("cache", "revalidated")
+
+# STATE
+
+_lock = threading.Lock()
+
+started_at = time.time()
+# one entry per fetched url
+fetches = []
+# {url: seconds spent parsing the page and extracting records from it}
+parses = {}
+# {stage: {'wall': seconds, 'cpu': seconds, 'runs': count}}
+stages = {}
+# {step: [seconds]}
+timings = {}
+# {collection: documents written}
+documents = {}
+# records reused from the parsed page cache, and pages parsed again
+parsed_cache = {'hit': 0, 'miss': 0}
+# (url, reason) of every page that could not be fetched, what would have
+# been scraped from it is missing from the run
+skipped = []
+
+
+def reset():
+    global started_at
+
+    with _lock:
+        started_at = time.time()
+        fetches.clear()
+        parses.clear()
+        stages.clear()
+        timings.clear()
+        documents.clear()
+        parsed_cache.update(hit=0, miss=0)
+        skipped.clear()
+
+
+def record_request(url: str, status, source: str, size: int, seconds: float):
+    with _lock:
+        fetches.append({
+            'url': url,
+            'status': status,
+            'source': source,
+            'bytes': size,
+            'seconds': seconds,
+        })
+
+
+def record_parse(url: str, seconds: float, memoized=False):
+    with _lock:
+        parses[url] = parses.get(url, 0) + seconds
+        parsed_cache['hit' if memoized else 'miss'] += 1
+
+
+def record_skip(url: str, reason: str):
+    with _lock:
+        skipped.append((url, reason))
+
+
+def count_documents(collection: str, count: int):
+    with _lock:
+        documents[collection] = documents.get(collection, 0) + count
+
+
+def observe(step: str, seconds: float):
+    with _lock:
+        timings.setdefault(step, []).append(seconds)
+
+
+@contextmanager
+def timed(step: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(step, time.perf_counter() - start)
+
+
+def add_stage(name: str, wall: float, cpu: float):
+    with _lock:
+        totals = stages.setdefault(name, {'wall': 0, 'cpu': 0, 'runs': 0})
+        totals['wall'] += wall
+        totals['cpu'] += cpu
+        totals['runs'] += 1
+
+
+@contextmanager
+def stage(name: str):
+    # wall and cpu time of a stage. the cpu time is that of the calling
+    # thread, pipeline stages and the scrapers each run in their own
+    start = time.perf_counter()
+    start_cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        add_stage(name, time.perf_counter() - start, time.thread_time() - start_cpu)
+
+
+def staged(f):
+    # runs every call of f as a stage named after it. a generator is only
+    # timed while it works on its next item, not while its consumer holds it
+    if not inspect.isgeneratorfunction(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with stage(f.__name__):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    @functools.wraps(f)
+    def generator_wrapper(*args, **kwargs):
+        wall = cpu = 0
+        items = f(*args, **kwargs)
+        try:
+            while True:
+                start = time.perf_counter()
+                start_cpu = time.thread_time()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                finally:
+                    wall += time.perf_counter() - start
+                    cpu += time.thread_time() - start_cpu
+
+                yield item
+        finally:
+            add_stage(f.__name__, wall, cpu)
+
+    return generator_wrapper
+
+
+def bucket_counts(times):
+    # cumulative counts per bucket, like a prometheus histogram
+    return [sum(1 for t in times if t <= upper) for upper in TIMING_BUCKETS]
+
+
+def summarize(times):
+    times = sorted(times)
+
+    return {
+        'count': len(times),
+        'sum': sum(times),
+        'mean': sum(times) / len(times),
+        'p50': times[len(times) // 2],
+        'p90': times[int(len(times) * 0.9)],
+        'max': times[-1],
+        'buckets': dict(zip(map(str, TIMING_BUCKETS), bucket_counts(times))),
+    }
+
+
+def report(success=True):
+    with _lock:
+        fetched = list(fetches)
+        finished_at = time.time()
+
+        hosts = {}
+        sources = {}
+        for request in fetched:
+            host = hosts.setdefault(urlsplit(request['url']).netloc, {
+                'requests': 0, 'bytes': 0, 'seconds': 0, 'statuses': {},
+            })
+            host['requests'] += 1
+            host['bytes'] += request['bytes']
+            host['seconds'] += request['seconds']
+            status = str(request['status'])
+            host['statuses'][status] = host['statuses'].get(status, 0) + 1
+            sources[request['source']] = sources.get(request['source'], 0) + 1
+
+        hits = sum(sources.get(source, 0) for source in CACHE_HITS)
+        pages = len(fetched) - sources.get("probe", 0)
+        parsed_total = parsed_cache['hit'] + parsed_cache['miss']
+
+        return {
+            'startedAt': started_at,
+            'finishedAt': finished_at,
+            'seconds': finished_at - started_at,
+            'cpuSeconds': time.process_time(),
+            'success': success,
+            'fetch': {
+                'requests': len(fetched),
+                'bytes': sum(request['bytes'] for request in fetched),
+                'seconds': sum(request['seconds'] for request in fetched),
+                'sources': sources,
+                'hosts': hosts,
+            },
+            'cache': {
+                'pageHitRate': hits / pages if pages else None,
+                'parsedHitRate': parsed_cache['hit'] / parsed_total if parsed_total else None,
+                'parsedHits': parsed_cache['hit'],
+                'parsedMisses': parsed_cache['miss'],
+            },
+            'stages': {name: dict(totals) for (name, totals) in stages.items()},
+            'timings': {step: summarize(times) for (step, times) in timings.items() if times},
+            'documents': dict(documents),
+            'skipped': [{'url': url, 'reason': reason} for (url, reason) in skipped],
+            'pages': [
+                {**request, 'parseSeconds': parses.get(request['url'])}
+                for request in fetched
+            ],
+        }
+
+
+def label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def sample_line(name: str, labels, value) -> str:
+    if not labels:
+        return f"{name} {value}"
+
+    label_text = ",".join(f'{key}="{label_value(v)}"' for (key, v) in labels.items())
+
+    return f"{name}{{{label_text}}} {value}"
+
+
+def prometheus(run) -> str:
+    # the report in the prometheus text format, per host rather than per url
+    # to keep the number of series small
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (labels, value) in samples:
+            lines.append(sample_line(name, labels, value))
+
+    metric("scraper_run_success", "gauge", "Whether the last run finished without an error",
+           [({}, int(run['success']))])
+    metric("scraper_run_timestamp_seconds", "gauge", "When the last run finished",
+           [({}, run['finishedAt'])])
+    metric("scraper_run_duration_seconds", "gauge", "Wall time of the last run",
+           [({}, run['seconds'])])
+    metric("scraper_run_cpu_seconds", "gauge", "Process cpu time of the last run",
+           [({}, run['cpuSeconds'])])
+
+    metric("scraper_fetch_requests", "gauge", "Pages fetched per host and status", [
+        ({'host': host, 'status': status}, count)
+        for (host, totals) in run['fetch']['hosts'].items()
+        for (status, count) in totals['statuses'].items()
+    ])
+    metric("scraper_fetch_bytes", "gauge", "Bytes of the pages fetched per host", [
+        ({'host': host}, totals['bytes']) for (host, totals) in run['fetch']['hosts'].items()
+    ])
+    metric("scraper_fetch_seconds", "gauge", "Time spent fetching pages per host", [
+        ({'host': host}, totals['seconds']) for (host, totals) in run['fetch']['hosts'].items()
+    ])
+    metric("scraper_fetch_source", "gauge", "Pages by where their content came from", [
+        ({'source': source}, count) for (source, count) in run['fetch']['sources'].items()
+    ])
+    metric("scraper_fetch_skipped", "gauge", "Pages that could not be fetched", [
+        ({}, len(run['skipped']))
+    ])
+    metric("scraper_parse_seconds", "gauge", "Time spent parsing pages", [
+        ({}, sum(page['parseSeconds'] or 0 for page in run['pages']))
+    ])
+
+    cache = run['cache']
+    metric("scraper_cache_hit_ratio", "gauge", "Share of pages served from the http cache or the parsed cache", [
+        ({'cache': name}, rate)
+        for (name, rate) in [("page", cache['pageHitRate']), ("parsed", cache['parsedHitRate'])]
+        if rate is not None
+    ])
+
+    metric("scraper_stage_wall_seconds", "gauge", "Wall time per stage", [
+        ({'stage': name}, totals['wall']) for (name, totals) in run['stages'].items()
+    ])
+    metric("scraper_stage_cpu_seconds", "gauge", "Cpu time per stage", [
+        ({'stage': name}, totals['cpu']) for (name, totals) in run['stages'].items()
+    ])
+    metric("scraper_documents_written", "gauge", "Documents written per collection", [
+        ({'collection': name}, count) for (name, count) in run['documents'].items()
+    ])
+
+    metric("scraper_step_seconds", "histogram", "Duration of timed steps", [])
+    for (step, summary) in run['timings'].items():
+        for (upper, count) in [*summary['buckets'].items(), ("+Inf", summary['count'])]:
+            lines.append(sample_line("scraper_step_seconds_bucket", {'step': step, 'le': upper}, count))
+        lines.append(sample_line("scraper_step_seconds_sum", {'step': step}, summary['sum']))
+        lines.append(sample_line("scraper_step_seconds_count", {'step': step}, summary['count']))
+
+    return "\n".join(lines) + "\n"
+
+
+def write_atomic(path: str, text: str):
+    # the node exporter may read the textfile at any moment
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    os.replace(tmp_path, path)
+
+
+def write(success=True):
+    if not report_path and not textfile_path:
+        return
+
+    run = report(success)
+    if report_path:
+        write_atomic(report_path, json.dumps(run, indent=2, default=str))
+    if textfile_path:
+        write_atomic(textfile_path, prometheus(run))
@@ -0,0 +1,148 @@
+import re
+
+from bisect import bisect_left
+
+# names the CICS directory and the course pages use for the same person
+aliases = {
+    'Andrew Lan': 'Shiting Lan',
+    'Ivan Lee': 'Sunghoon Lee',
+    'Joe Chiu': 'Meng-Chieh Chiu'
+}
+
+
+def is_name_short_for(a: str, b: str):
+    a_words = a.split(" ")
+    b_words = b.split(" ")
+
+    if b_words[0].find(a_words[0]) == 0 or a_words[0].find(b_words[0]) == 0:
+        b_remaining = set(b_words[1:])
+        a_remaining = set(a_words[1:])
+
+        return b_remaining.issubset(a_remaining) or a_remaining.issubset(b_remaining)
+
+
+def words_of(name: str):
+    # the words a text index splits a name into
+    return re.findall(r"[^\W_]+", name.lower())
+
+
+def text_scores(names):
+    # word -> the textScore mongo gives a document with these names for a
+    # search of that word. every name is scored on its own and the scores add
+    # up: the repeats of a word in a name count 1, 1/2, 1/4... times 0.5 plus
+    # half its share of the words of the name, and a tenth more when it is the
+    # whole name. mongo also stems words and drops stop words, names hardly
+    # ever have either
+    scores = {}
+    for name in names:
+        words = words_of(name)
+        counts = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + 1
+
+        for (word, count) in counts.items():
+            frequency = 2 - 2 ** (1 - count)
+            coefficient = 0.5 * count / len(words) + 0.5
+            boost = 1.1 if name.lower() == word else 1
+            scores[word] = scores.get(word, 0) + frequency * coefficient * boost
+
+    return scores
+
+
+class NameIndex:
+    # answers "which staff member is this name" for instructor names scraped
+    # from course pages. a name is matched exactly first, otherwise staff are
+    # ranked like the old $text search (textScore over number of names) and
+    # the best ranked one that either scores 1 or more or has a name that
+    # is_name_short_for the instructor name wins. one word in common scores
+    # 0.75, a name only scores 1 when more of its words match
+
+    def __init__(self, staff_list, aliases=None):
+        aliases = aliases or {}
+
+        self.staff_list = staff_list
+        self.exact = {}
+        # lowercase word -> [staff position, textScore of the word over number of names]
+        self.words = {}
+        # first word of a name -> [(staff position, remaining words)]
+        self.first_words = {}
+        self.memo = {}
+
+        for (position, staff) in enumerate(staff_list):
+            names = list(staff['names'])
+            for name in staff['names']:
+                if name in aliases and aliases[name] not in names:
+                    names.append(aliases[name])
+
+            for name in names:
+                self.exact.setdefault(name, staff)
+
+                name_words = name.split(" ")
+                self.first_words.setdefault(name_words[0], []).append(
+                    (position, frozenset(name_words[1:]))
+                )
+
+            for (word, score) in text_scores(names).items():
+                self.words.setdefault(word, []).append((position, score / len(names)))
+
+        self.sorted_first_words = sorted(self.first_words)
+
+    def scores_for(self, staff_name: str):
+        scores = {}
+        for word in set(words_of(staff_name)):
+            for (position, score) in self.words.get(word, []):
+                scores[position] = scores.get(position, 0) + score
+
+        return scores
+
+    def names_with_prefix_relation(self, first_word: str):
+        # names whose first word starts with first_word, found by bisecting the
+        # sorted first words, and names whose first word is a prefix of it
+        start = bisect_left(self.sorted_first_words, first_word)
+        for stored_word in self.sorted_first_words[start:]:
+            if not stored_word.startswith(first_word):
+                break
+
+            yield from self.first_words[stored_word]
+
+        for end in range(len(first_word) - 1, -1, -1):
+            stored_word = first_word[:end]
+            if stored_word in self.first_words:
+                yield from self.first_words[stored_word]
+
+    def find(self, staff_name: str):
+        staff = self.exact.get(staff_name)
+        if staff:
+            return staff
+
+        scores = self.scores_for(staff_name)
+        if not scores:
+            return None
+
+        def rank(position):
+            return (-scores[position], position)
+
+        best = min(scores, key=rank)
+        if scores[best] >= 1:
+            return self.staff_list[best]
+
+        name_words = staff_name.split(" ")
+        remaining = set(name_words[1:])
+
+        matches = [
+            position
+            for (position, stored_remaining) in self.names_with_prefix_relation(name_words[0])
+            if position in scores and (
+                remaining.issubset(stored_remaining) or stored_remaining.issubset(remaining)
+            )
+        ]
+        if matches:
+            return self.staff_list[min(matches, key=rank)]
+
+        return None
+
+    def lookup(self, staff_name: str):
+        if staff_name not in self.memo:
+            self.memo[staff_name] = self.find(staff_name)
+
+        return self.memo[staff_name]
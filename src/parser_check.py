@@ -0,0 +1,71 @@
+import sys
+import types
+
+import cache
+import web
+
+# (url fragment, parse-only filter, extractor) for every page kind we read,
+# the first matching fragment wins
+page_kinds = [
+    ("/csinfo/autogen/cicsdesc1", web.CICS_PAGE_ONLY, web.parse_cics_page),
+    ("/course-descriptions?semester_tid=", web.MATH_PAGE_ONLY, web.parse_math_page),
+    ("/course-descriptions", web.MATH_INDEX_ONLY, web.parse_math_index),
+    ("/people/all-faculty-staff", web.STAFF_DIRECTORY_ONLY, web.parse_staff_directory),
+    ("www.cics.umass.edu/people/", None, web.parse_staff_profile),
+    ("/academic-calendar", web.CALENDAR_ONLY, web.parse_academic_calendar),
+]
+
+
+def kind_of(url: str):
+    for kind in page_kinds:
+        if kind[0] in url:
+            return kind
+
+
+def extract_with(extract, soup):
+    result = extract(soup)
+    if isinstance(result, types.GeneratorType):
+        result = list(result)
+
+    return result
+
+
+def check_page(url: str, content: bytes):
+    (_, parse_only, extract) = kind_of(url)
+
+    expected = extract_with(extract, web.parse(content, parser="html5lib"))
+    actual = extract_with(extract, web.parse(content, parse_only))
+
+    return expected == actual
+
+
+def main(args):
+    # compares the configured parser and filters against a full html5lib
+    # tree on every page recorded in the http cache
+    if web.html_parser == "html5lib":
+        print("Set HTML_PARSER to the parser that should be checked.")
+        return 1
+
+    checked = 0
+    mismatched = []
+    for entry in cache.entries():
+        url = entry['url']
+        if not kind_of(url) or (len(args) > 1 and not any(f in url for f in args[1:])):
+            continue
+
+        content = cache.read(entry)
+        if content is None:
+            continue
+
+        checked += 1
+        if not check_page(url, content):
+            mismatched.append(url)
+            print("Mismatch", url)
+
+    print(f"Checked {checked} pages with {web.html_parser}, {len(mismatched)} mismatched.")
+
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,89 @@
+import os
+import queue
+import threading
+
+import metrics
+
+# SETTINGS
+
+# items a stage may run ahead of the next one before it has to wait
+queue_size = int(os.environ.get("PIPELINE_QUEUE_SIZE", "64"))
+
+# CONSTANTS
+
+DONE = object()
+
+
+def iter_queue(inbox: queue.Queue):
+    while (item := inbox.get()) is not DONE:
+        yield item
+
+
+def batched(items, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+class Pipeline:
+    # stages run in their own threads and hand items to the next stage through
+    # bounded queues, so a slow stage holds back the ones before it instead of
+    # everything piling up in memory. a stage is a function that takes the
+    # items of the stage before it and yields its own
+
+    def __init__(self):
+        self.threads = []
+        self.errors = []
+
+    def start(self, target):
+        thread = threading.Thread(target=target)
+        thread.start()
+        self.threads.append(thread)
+
+    def run(self, name, work, inbox, outbox):
+        received = iter_queue(inbox) if inbox else None
+        try:
+            with metrics.stage(name):
+                items = work(received) if inbox else work()
+                for item in items if outbox else []:
+                    outbox.put(item)
+        except BaseException as e:
+            print(f"Pipeline stage {name} failed:", e)
+            self.errors.append(e)
+
+            # keep the stage before this one from blocking on a full queue.
+            # what is left is read through the same iterator, the stage may
+            # have read up to DONE already
+            if inbox:
+                for _ in received:
+                    pass
+        finally:
+            if outbox:
+                outbox.put(DONE)
+
+    def stage(self, name, work, inbox=None):
+        outbox = queue.Queue(maxsize=queue_size)
+        self.start(lambda: self.run(name, work, inbox, outbox))
+
+        return outbox
+
+    def sink(self, name, work, inbox):
+        # the last stage of a chain, work consumes the items it is given
+        self.start(lambda: self.run(name, work, inbox, None))
+
+    def task(self, name, work):
+        # an independent job that runs alongside the stages
+        self.start(lambda: self.run(name, work, None, None))
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+        if self.errors:
+            raise self.errors[0]
@@ -0,0 +1,136 @@
+import re
+
+# the prerequisite graph of the courses, parsed out of the free text of their
+# enrollment requirements. the text is not read as and/or logic, every course
+# it names is a prerequisite. "what does X unlock" and "the full chain behind
+# Y" are then a lookup of one document instead of a scan over every course
+
+# CONSTANTS
+
+# how subjects are written in requirement texts -> how they are written in
+# course ids
+SUBJECT_ALIASES = {
+    'CMPSCI': "COMPSCI",
+    'CS': "COMPSCI",
+    'INFORMATICS': "INFO",
+    'STAT': "STATISTIC",
+    'STATS': "STATISTIC",
+    'STATISTC': "STATISTIC",
+}
+SUBJECTS = {"COMPSCI", "CICS", "INFO", "INFOSEC", "MATH", "STATISTIC", *SUBJECT_ALIASES}
+# capitalized words that come before a number without being a subject
+NOT_SUBJECTS = {"AND", "OR", "OF", "IN", "WITH", "ONE", "EITHER", "BOTH"}
+# a course number, and the word before it which may be its subject. a number
+# without a subject belongs to the last one named, as in "COMPSCI 220 or 230".
+# "300-level", "100 level", "120 credits" and "GPA 3.000" are not course numbers
+COURSE_REFERENCE = re.compile(
+    r"\b(?:([A-Za-z]{2,12})\s*)?(?<![.\d])(\d{3}[A-Z]{0,2})\b(?!-|\s*(?i:credits?|level)\b)"
+)
+
+
+def subject_of(word):
+    # the subject a word names, or None if it is an ordinary word. subjects
+    # outside the catalog (ECE, PHYSICS) are only recognized in capitals
+    upper = word.upper()
+    if upper in SUBJECTS:
+        return SUBJECT_ALIASES.get(upper, upper)
+    if word.isupper() and upper not in NOT_SUBJECTS:
+        return upper
+
+    return None
+
+
+def parse_requirement(requirement: str):
+    # the ids of every course a requirement text names, in order
+    course_ids = []
+    subject = None
+    for match in COURSE_REFERENCE.finditer(requirement or ""):
+        word, number = match.groups()
+        if word and (named := subject_of(word)):
+            subject = named
+        if subject is None:
+            continue
+
+        course_id = f"{subject} {number}"
+        if course_id not in course_ids:
+            course_ids.append(course_id)
+
+    return course_ids
+
+
+def closure(edges, start):
+    # every course reachable from start over edges, start itself only when it
+    # is part of a cycle
+    seen = set()
+    stack = list(edges.get(start, ()))
+    while stack:
+        course_id = stack.pop()
+        if course_id not in seen:
+            seen.add(course_id)
+            stack.extend(edges.get(course_id, ()))
+
+    return seen
+
+
+def build(courses):
+    # one document per course {'id', 'prerequisites', 'allPrerequisites',
+    # 'dependents', 'allDependents', 'level'} out of documents with an id and
+    # an enrollmentRequirement. the level is the length of the longest chain
+    # of prerequisites below a course, courses on a cycle share theirs
+    prerequisites = {}
+    for course in courses:
+        references = parse_requirement(course.get('enrollmentRequirement'))
+        prerequisites[course['id']] = [
+            course_id for course_id in references if course_id != course['id']
+        ]
+
+    dependents = {}
+    for (course_id, required) in prerequisites.items():
+        for required_id in required:
+            dependents.setdefault(required_id, []).append(course_id)
+
+    below = {course_id: closure(prerequisites, course_id) for course_id in prerequisites}
+    above = {course_id: closure(dependents, course_id) for course_id in prerequisites}
+
+    def cycle_of(course_id):
+        # the other courses of a cycle are both below and above this one
+        return (below.get(course_id, set()) & above.get(course_id, set())) | {course_id}
+
+    # worked out below first, without recursion as chains can be long
+    levels = {}
+    for start in prerequisites:
+        stack = [start]
+        while stack:
+            course_id = stack[-1]
+            if course_id in levels:
+                stack.pop()
+                continue
+
+            members = cycle_of(course_id)
+            required = [
+                required_id
+                for member in members
+                for required_id in prerequisites.get(member, ())
+                if required_id not in members
+            ]
+            if pending := [required_id for required_id in required if required_id not in levels]:
+                stack.extend(pending)
+                continue
+
+            level = max((levels[required_id] + 1 for required_id in required), default=0)
+            for member in members:
+                levels[member] = level
+            stack.pop()
+
+    documents = []
+    for course_id in prerequisites:
+        documents.append({
+            'id': course_id,
+            'prerequisites': prerequisites[course_id],
+            'allPrerequisites': sorted(below[course_id] - {course_id}),
+            'dependents': sorted(dependents.get(course_id, [])),
+            'allDependents': sorted(above[course_id] - {course_id}),
+            'level': levels[course_id],
+        })
+
+    return documents
@@ -0,0 +1,84 @@
+import sys
+
+# compact records for what is scraped, they only become dicts when they are
+# written. every field is a slot named like its key in the db, a field that is
+# None is left out of the document. strings that repeat across thousands of
+# records are interned so they are only held once
+
+
+def intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Record:
+    __slots__ = ()
+
+    # fields whose strings are interned when a record is built, values set
+    # later on are interned where they are set
+    INTERNED = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            value = fields.pop(name, None)
+            setattr(self, name, intern(value) if name in self.INTERNED else value)
+
+        if fields:
+            raise TypeError(f"{type(self).__name__} has no field {', '.join(fields)}")
+
+    @classmethod
+    def from_document(cls, document):
+        return cls(**{name: document[name] for name in cls.__slots__ if name in document})
+
+    def to_document(self):
+        document = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is not None:
+                document[name] = value
+
+        return document
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_document()!r})"
+
+
+class Course(Record):
+    __slots__ = (
+        'subject', 'id', 'number', 'title', 'description', 'staff', 'website',
+        'frequency', 'enrollmentRequirement',
+        # from spire
+        'career', 'units', 'gradingBasis', 'components',
+    )
+    INTERNED = ('subject', 'frequency', 'career', 'units', 'gradingBasis', 'components')
+
+
+class Staff(Record):
+    __slots__ = ('names', 'title', 'email', 'phone', 'office', 'website', 'photo')
+    INTERNED = ('title',)
+
+
+class Event(Record):
+    __slots__ = ('date', 'description')
+
+
+class Semester(Record):
+    __slots__ = ('season', 'year', 'events', 'startDate', 'endDate')
+    INTERNED = ('season', 'year')
+
+    @classmethod
+    def from_document(cls, document):
+        semester = super().from_document(document)
+        semester.events = [Event.from_document(event) for event in semester.events or []]
+
+        return semester
+
+    def to_document(self):
+        document = super().to_document()
+        document['events'] = [event.to_document() for event in self.events]
+
+        return document
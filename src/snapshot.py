@@ -0,0 +1,100 @@
+import os
+import gzip
+import json
+import threading
+
+from datetime import datetime
+
+# a snapshot holds the records of a scrape as gzipped json lines. the first
+# line is a header with the format version, every other line is one record
+# {"kind": "course" | "staff" | "semester", "data": {...}} in the order they
+# were scraped. both ends stream, neither holds more than one record
+
+# SETTINGS
+
+compress_level = int(os.environ.get("SNAPSHOT_COMPRESS_LEVEL", "6"))
+
+# CONSTANTS
+
+FORMAT = "umass-spire-scraper"
+# bump whenever the records written change shape
+VERSION = 1
+KINDS = ("course", "staff", "semester")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def encode(value):
+    # json.dumps default, datetimes are the only values json can not hold
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+
+    raise TypeError(f"{type(value).__name__} can not be written to a snapshot")
+
+
+def decode(obj):
+    if len(obj) == 1 and '$date' in obj:
+        return datetime.fromisoformat(obj['$date'])
+
+    return obj
+
+
+class SnapshotWriter:
+    # records can be written from several threads, the file only shows up
+    # under its path once the writer is closed after a complete scrape
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(KINDS, 0)
+
+        self.file = gzip.open(self.tmp_path, "wt", encoding="utf-8", compresslevel=compress_level)
+        self.file.write(json.dumps({
+            'format': FORMAT,
+            'version': VERSION,
+            'createdAt': datetime.now().astimezone(),
+        }, default=encode) + "\n")
+
+    def write(self, kind: str, record):
+        line = json.dumps({'kind': kind, 'data': record}, default=encode)
+
+        with self.lock:
+            self.file.write(line + "\n")
+            self.counts[kind] += 1
+
+    def tee(self, kind: str, records):
+        # writes every record to the snapshot on its way through
+        for record in records:
+            self.write(kind, record)
+            yield record
+
+    def close(self, complete=True):
+        if self.file.closed:
+            return
+
+        self.file.close()
+
+        if complete:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+
+def read(path: str, kind: str):
+    # yields the records of one kind from a snapshot
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get('format') != FORMAT:
+            raise SnapshotError(f"{path} is not a snapshot")
+        if header.get('version') != VERSION:
+            raise SnapshotError(
+                f"{path} is a version {header.get('version')} snapshot, version {VERSION} is needed"
+            )
+
+        for line in f:
+            entry = json.loads(line, object_hook=decode)
+            if entry['kind'] == kind:
+                yield entry['data']
@@ -1,4 +1,7 @@
 import os
+import sys
+import queue
+import threading
 
 from selenium.webdriver.common.by import By
 
@@ -6,16 +9,37 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 from selenium.webdriver.remote.webelement import WebElement
-from selenium.webdriver.remote.errorhandler import NoSuchElementException, WebDriverException
+from selenium.webdriver.remote.errorhandler import WebDriverException
 
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.firefox.webdriver import WebDriver
 
 import re
 
+from bs4 import BeautifulSoup
+
+import metrics
+import spire_checkpoint
+from text import clean_text as clean
+
 # SETTINGS
 
-wait_time = 2
+# seconds to wait for an element to show up and for spire to answer a click,
+# waits return as soon as the page is ready and only fail after these
+element_timeout = 10
+processing_timeout = 60 * 2
+poll_interval = 0.05
+# "selenium" drives firefox, "http" replays the catalog's form posts directly
+backend = os.environ.get("SPIRE_BACKEND", "selenium")
+# number of browsers scraping spire side by side
+workers = int(os.environ.get("SPIRE_WORKERS", "1"))
+# times a shard is retried on a fresh browser before giving up on it
+worker_retries = int(os.environ.get("SPIRE_RETRIES", "2"))
+# courses handed to the worker pool at once when enriching a stream of courses
+batch_size = int(os.environ.get("SPIRE_BATCH_SIZE", "250"))
+# keep the catalog clients of a run open for the next one instead of quitting
+# them, the daemon turns this on. see close_warm()
+keep_warm = False
 
 # CONSTANTS
 
@@ -26,6 +50,46 @@ category_list = [
     "MATH",
     "STATISTC",
 ]
+CATEGORY_LINK = {category: re.compile(f"^{category} - .+$") for category in category_list}
+
+# STATE
+
+# start function -> [(client, state)] of the clients left open by earlier runs
+_warm = {}
+_warm_lock = threading.Lock()
+
+# true once spire has answered a postback. every answer increments the
+# ICStateNum hidden field of the win0 form, so a changed state number with no
+# processing overlay showing and a loaded document means the new page is in
+READY_SCRIPT = """
+var state = document.getElementById('ICStateNum');
+var processing = document.getElementById('processing');
+var busy = processing && processing.offsetParent !== null;
+return document.readyState === 'complete' && !busy
+    && (!state || state.value !== arguments[0]);
+"""
+STATE_SCRIPT = """
+var state = document.getElementById('ICStateNum');
+return state ? state.value : null;
+"""
+
+# (course field, id prefix of the elements holding it on a course page)
+course_attribs = [
+    ("career", "SSR_CRSE_OFF_VW_ACAD_CAREER$"),
+    ("units", "DERIVED_CRSECAT_UNITS_RANGE$"),
+    ("gradingBasis", "SSR_CRSE_OFF_VW_GRADING_BASIS$"),
+    ("components", "DERIVED_CRSECAT_DESCR$"),
+    ("enrollmentRequirement", "DERIVED_CRSECAT_DESCR254A$"),
+]
+# checkpointed fields are only reused while the set of fields stays the same
+FIELD_SET = ",".join(attrib for (attrib, _) in course_attribs)
+COURSE_FIELD_ID = re.compile(
+    "^(" + "|".join(re.escape(elem_id) for (_, elem_id) in course_attribs) + r")(\d+)$"
+)
+
+class SpireError(Exception):
+    pass
+
 
 def is_env_true(key):
     return os.environ.get(key, "FALSE").upper() == "TRUE"
@@ -38,12 +102,36 @@ def find(f, lst):
 
 
 def text_of(elem: WebElement):
-    s = elem.text
+    return clean(elem.text)
+
+
+def timed(step: str):
+    return metrics.timed("spire " + step)
+
 
-    for r in ["\n", "\t", "  "]:
-        s = s.replace(r, " ")
+def print_timings():
+    for (name, times) in list(metrics.timings.items()):
+        if not name.startswith("spire "):
+            continue
 
-    return s.strip()
+        step = name[len("spire "):]
+        times = sorted(times)
+        print(
+            f"{step}: {len(times)} in {sum(times):.1f}s, "
+            f"mean {sum(times) / len(times):.3f}s, "
+            f"p50 {times[len(times) // 2]:.3f}s, "
+            f"p90 {times[int(len(times) * 0.9)]:.3f}s, "
+            f"max {times[-1]:.3f}s"
+        )
+
+        counts = []
+        lower = 0
+        for upper in metrics.TIMING_BUCKETS + [float("inf")]:
+            counts.append(sum(1 for t in times if lower < t <= upper))
+            lower = upper
+
+        labels = [f"<={upper}s" for upper in metrics.TIMING_BUCKETS] + [f">{metrics.TIMING_BUCKETS[-1]}s"]
+        print("  " + "  ".join(f"{label}: {count}" for (label, count) in zip(labels, counts) if count))
 
 
 def create_driver() -> WebDriver:
@@ -56,27 +144,27 @@ def create_driver() -> WebDriver:
     return WebDriver()
 
 
-def wait_until_not_processing(driver: WebDriver):
+def wait_until_not_processing(driver: WebDriver, state_before=None):
     while True:
         try:
-            WebDriverWait(driver, 60 * 2).until_not(
-                EC.visibility_of_any_elements_located((By.ID, "processing"))
+            WebDriverWait(driver, processing_timeout, poll_frequency=poll_interval).until(
+                lambda d: d.execute_script(READY_SCRIPT, state_before)
             )
             break
         except WebDriverException:
             print("Spire seems to be a little slow, you should try again later.")
             if not is_env_true("RETRY"):
-                exit(-1)
+                raise SpireError("Spire did not finish processing")
 
 
 def wait_for_element(driver: WebDriver, attrib: str, value: str) -> WebElement:
     try:
-        WebDriverWait(driver, 10).until(
+        WebDriverWait(driver, element_timeout, poll_frequency=poll_interval).until(
             EC.presence_of_element_located((attrib, value))
         )
     except WebDriverException:
         print("Unable to wait for", attrib, value)
-        exit(-1)
+        raise SpireError(f"Unable to wait for {attrib} {value}")
 
     return driver.find_element(attrib, value)
 
@@ -84,12 +172,12 @@ def wait_for_element(driver: WebDriver, attrib: str, value: str) -> WebElement:
 def wait_for_elements(driver: WebDriver, attrib: str, value: str) -> WebElement:
     found = None
     try:
-        found = WebDriverWait(driver, 10).until(
+        found = WebDriverWait(driver, element_timeout, poll_frequency=poll_interval).until(
             EC.visibility_of_all_elements_located((attrib, value))
         )
     except WebDriverException:
         print("Unable to wait for", attrib, value)
-        exit(-1)
+        raise SpireError(f"Unable to wait for {attrib} {value}")
 
     return found
 
@@ -98,18 +186,17 @@ def click_element(driver: WebDriver, attrib: str, value: str) -> None:
     wait_for_element(driver, attrib, value)
     
     try:
-        WebDriverWait(driver, 10).until(
+        WebDriverWait(driver, element_timeout, poll_frequency=poll_interval).until(
             EC.element_to_be_clickable((attrib, value))
         ).click()
     except WebDriverException:
         print("Unable to click", attrib, value)
 
-    driver.implicitly_wait(wait_time)
-
 
 def click_spire_element(driver: WebDriver, attrib: str, value: str) -> None:
+    state_before = driver.execute_script(STATE_SCRIPT)
     click_element(driver, attrib, value)
-    wait_until_not_processing(driver)
+    wait_until_not_processing(driver, state_before)
 
 
 def navigate_to_catalog(driver: WebDriver):
@@ -119,87 +206,276 @@ def navigate_to_catalog(driver: WebDriver):
     click_element(driver, By.CSS_SELECTOR, "#crefli_HC_SSS_BROWSE_CATLG_GBL4 > a")
 
 
-def find_all_with_id(driver: WebDriver, base_id):
-    found = []
+def extract_course_fields(soup: BeautifulSoup):
+    # the texts of every course_attribs element on a course page, read in a
+    # single pass over the page. numbered elements count up from $0 and stop
+    # at the first one that is missing
+    numbered = {}
+    for elem in soup.find_all(id=COURSE_FIELD_ID):
+        match = COURSE_FIELD_ID.match(elem['id'])
+        numbered[(match.group(1), int(match.group(2)))] = clean(elem.get_text())
 
-    i = 0
-    while True:
-        try:
-            found.append(text_of(driver.find_element_by_id(base_id + str(i))))
-        except NoSuchElementException:
-            break
-        i = i + 1
+    fields = {}
+    for (attrib, elem_id) in course_attribs:
+        found = []
+        while (elem_id, len(found)) in numbered:
+            found.append(numbered[(elem_id, len(found))])
 
-    return ", ".join(found), found
+        fields[attrib] = found
 
+    return fields
 
-def scrape_course_page(driver: WebDriver, course):
-    wait_for_element(driver, By.ID, "ACE_DERIVED_SAA_CRS_GROUP1")
-    attribs = [
-        ("career", "SSR_CRSE_OFF_VW_ACAD_CAREER$"),
-        ("units", "DERIVED_CRSECAT_UNITS_RANGE$"),
-        ("gradingBasis", "SSR_CRSE_OFF_VW_GRADING_BASIS$"),
-        ("components", "DERIVED_CRSECAT_DESCR$"),
-        ("enrollmentRequirement", "DERIVED_CRSECAT_DESCR254A$"),
-    ]
-    for (attrib, elem_id) in attribs:
-        text, found = find_all_with_id(driver, elem_id)
+
+def apply_course_fields(course, fields):
+    for (attrib, _) in course_attribs:
+        found = fields.get(attrib, [])
+        text = ", ".join(found)
         if attrib == "gradingBasis":
-            course[attrib] = text.replace("Grad Ltr Grading", "Graduate Letter Grading")
+            course.gradingBasis = sys.intern(text.replace("Grad Ltr Grading", "Graduate Letter Grading"))
         elif attrib == "enrollmentRequirement":
             for req in found:
                 if not req.startswith("Pre"):
-                    if attrib in course:
-                        course[attrib] += ", " + req
+                    if course.enrollmentRequirement is not None:
+                        course.enrollmentRequirement += ", " + req
                     else:
-                        course[attrib] = req
+                        course.enrollmentRequirement = req
 
         elif len(text) > 0:
-            course[attrib] = text
+            # careers, units and components repeat across most courses
+            setattr(course, attrib, sys.intern(text))
 
 
-def scrape_additional_course_information(course_map):
-    driver = create_driver()
-    navigate_to_catalog(driver)
+def scrape_course_page(driver: WebDriver):
+    wait_for_element(driver, By.ID, "ACE_DERIVED_SAA_CRS_GROUP1")
 
-    frame = wait_for_element(driver, By.ID, "ptifrmtgtframe")
-    driver.switch_to.frame(frame)
+    # one read of the page instead of probing for every numbered element,
+    # a probe for a missing element blocks for the whole implicit wait
+    soup = BeautifulSoup(driver.page_source, "html.parser")
 
-    current_letter = ""
-    for category in category_list:
-        category_letter = category[0]
-        if current_letter != category_letter:
-            click_spire_element(driver, By.ID, "DERIVED_SSS_BCC_SSR_ALPHANUM_" + category_letter)
-            current_letter = category_letter
+    return extract_course_fields(soup)
 
-        category_link = find(
-            lambda elem, cat=category: re.match(f"^{cat} - .+$", elem.text),
-            wait_for_elements(driver, By.CSS_SELECTOR, "a.SSSHYPERLINKBOLD")
-        )
-        category_link_id = category_link.get_attribute("id")
 
-        click_spire_element(driver, By.ID, category_link_id)
+def start_driver():
+    with timed("catalog"):
+        driver = create_driver()
+        navigate_to_catalog(driver)
+
+        frame = wait_for_element(driver, By.ID, "ptifrmtgtframe")
+        driver.switch_to.frame(frame)
+
+    return driver, {'letter': ""}
+
+
+def open_category(driver: WebDriver, state, category: str, pending):
+    category_letter = category[0]
+    if state['letter'] != category_letter:
+        click_spire_element(driver, By.ID, "DERIVED_SSS_BCC_SSR_ALPHANUM_" + category_letter)
+        state['letter'] = category_letter
+
+    category_link = find(
+        lambda elem: CATEGORY_LINK[category].match(elem.text),
+        wait_for_elements(driver, By.CSS_SELECTOR, "a.SSSHYPERLINKBOLD")
+    )
+    if not category_link:
+        raise SpireError(f"Unable to find category {category}")
+
+    category_link_id = category_link.get_attribute("id")
+
+    click_spire_element(driver, By.ID, category_link_id)
+
+    course_table = wait_for_element(driver, By.CSS_SELECTOR, "table[id^=COURSE_LIST]")
+
+    def id_map(link_element, cat=category):
+        return (cat + " " + text_of(link_element).upper(),
+                link_element.get_attribute("id"))
+
+    course_link_id_list = list(map(
+        id_map,
+        course_table.find_elements(By.CSS_SELECTOR, "a[id^=CRSE_NBR]")
+    ))
+    course_link_id_list = list(filter(
+        lambda ids: ids[0] in pending,
+        course_link_id_list
+    ))
 
-        course_table = wait_for_element(driver, By.CSS_SELECTOR, "table[id^=COURSE_LIST]")
+    return category_link_id, course_link_id_list
 
-        def id_map(link_element, cat=category):
-            return (cat + " " + text_of(link_element).upper(),
-                    link_element.get_attribute("id"))
 
-        course_link_id_list = list(map(
-            id_map,
-            course_table.find_elements_by_css_selector("a[id^=CRSE_NBR]")
-        ))
-        course_link_id_list = list(filter(
-            lambda ids: ids[0] in course_map,
-            course_link_id_list
-        ))
+def scrape_shard(driver: WebDriver, state, shard, pending):
+    # a shard is every parts-th pending course of a category starting at
+    # part, returns the fields scraped for each of them
+    (category, part, parts) = shard
+    with timed("category"):
+        category_link_id, course_link_id_list = open_category(driver, state, category, pending)
 
-        for (course_id, link_id) in course_link_id_list:
+    scraped = {}
+    for (course_id, link_id) in course_link_id_list[part::parts]:
+        with timed("course"):
             click_spire_element(driver, By.ID, link_id)
-            scrape_course_page(driver, course_map[course_id])
+            fields = scrape_course_page(driver)
+        with timed("return"):
             click_spire_element(driver, By.ID, "DERIVED_SAA_CRS_RETURN_PB")
 
+        spire_checkpoint.record(course_id, FIELD_SET, fields)
+        scraped[course_id] = fields
+
+    with timed("category close"):
         click_spire_element(driver, By.ID, category_link_id)
 
-    driver.quit()
+    return scraped
+
+
+def take_warm(start):
+    # a client start() opened for an earlier run, or None
+    with _warm_lock:
+        clients = _warm.get(start)
+
+        return clients.pop() if clients else None
+
+
+def release(start, driver, state, warm):
+    if not warm:
+        driver.quit()
+        return
+
+    with _warm_lock:
+        _warm.setdefault(start, []).append((driver, state))
+
+
+def close_warm():
+    with _warm_lock:
+        clients = [client for clients in _warm.values() for client in clients]
+        _warm.clear()
+
+    for (driver, _) in clients:
+        quit_quietly(driver)
+
+
+def quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def run_worker(start, scrape, shard_queue, pending, results, warm):
+    # start() opens the catalog and returns (client, state), the client is
+    # a browser or an http catalog session and is quit when done with, or
+    # kept for the next run when warm. a warm client whose catalog
+    # session expired fails its first shard and is replaced like any other.
+    # a shard that fails every attempt is left out of results
+    driver = None
+    state = None
+
+    while True:
+        try:
+            shard = shard_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        for attempt in range(worker_retries + 1):
+            try:
+                if driver is None:
+                    driver, state = take_warm(start) or start()
+
+                results[shard] = scrape(driver, state, shard, pending)
+                break
+            except Exception as e:
+                print(f"Spire worker failed on {shard[0]} (attempt {attempt + 1}):",
+                      f"{type(e).__name__}: {e}")
+
+                # start over on a fresh client, the old one is in an unknown state
+                if driver is not None:
+                    quit_quietly(driver)
+                    driver = None
+
+    if driver is not None:
+        release(start, driver, state, warm)
+
+
+def scrape_additional_course_information(course_map, max_age=None, warm=None, report=True):
+    # courses checkpointed by an earlier (or crashed) run are not visited
+    # again while their fields are fresh, the rest are split into shards per
+    # category that are handed out to a pool of browsers (or http sessions),
+    # with enough shards per category to keep them all busy. warm keeps the
+    # clients open for the next call, keep_warm by default
+    checkpointed = spire_checkpoint.load(FIELD_SET, max_age)
+    pending = set(course_map) - set(checkpointed)
+    print(f"Spire: {len(course_map) - len(pending)} courses checkpointed, {len(pending)} to visit")
+
+    # only the categories with courses left to visit share the workers, a
+    # batch of math courses alone still keeps every worker busy
+    active = [
+        category
+        for category in category_list
+        if any(course_id.startswith(category + " ") for course_id in pending)
+    ]
+    parts = max(1, -(-workers // max(1, len(active))))
+    shards = [(category, part, parts) for category in active for part in range(parts)]
+
+    if backend == "http":
+        import spire_http
+        start, scrape = spire_http.start_client, spire_http.scrape_shard
+    else:
+        start, scrape = start_driver, scrape_shard
+
+    shard_queue = queue.Queue()
+    for shard in shards:
+        shard_queue.put(shard)
+
+    results = {}
+    threads = [
+        threading.Thread(
+            target=run_worker,
+            args=(start, scrape, shard_queue, pending, results, keep_warm if warm is None else warm)
+        )
+        for _ in range(max(1, min(workers, len(shards))))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if report:
+        print_timings()
+
+    failures = [shard for shard in shards if shard not in results]
+    if failures:
+        raise SpireError(
+            "Unable to scrape " + ", ".join(f"{cat} ({part + 1}/{n})" for (cat, part, n) in failures)
+        )
+
+    scraped = {}
+    for shard in shards:
+        scraped.update(results[shard])
+
+    # merged in course order so the result never depends on worker timing
+    for (course_id, course) in course_map.items():
+        fields = scraped.get(course_id, checkpointed.get(course_id))
+        if fields is not None:
+            apply_course_fields(course, fields)
+
+
+def enrich(courses, max_age=None):
+    # enriches a stream of courses in batches, yielding them back as each
+    # batch is done. the clients stay open from one batch to the next, so a
+    # run starts its browsers once, and the timings are printed at the end
+    def scrape(batch):
+        scrape_additional_course_information(batch, max_age, warm=True, report=False)
+
+        return batch.values()
+
+    try:
+        batch = {}
+        for course in courses:
+            batch[course.id] = course
+            if len(batch) >= batch_size:
+                yield from scrape(batch)
+                batch = {}
+
+        if batch:
+            yield from scrape(batch)
+    finally:
+        if not keep_warm:
+            close_warm()
+        print_timings()
@@ -0,0 +1,64 @@
+import os
+import json
+import time
+import threading
+
+# SETTINGS
+
+checkpoint_path = os.environ.get("SPIRE_CHECKPOINT", ".spire_checkpoint.jsonl")
+# seconds the spire fields of a course are trusted before it is visited again
+ttl = int(os.environ.get("SPIRE_CHECKPOINT_TTL", str(60 * 60 * 24 * 7)))
+enabled = os.environ.get("SPIRE_CHECKPOINT_ENABLED", "TRUE").upper() == "TRUE"
+
+# STATE
+
+_lock = threading.Lock()
+
+
+def load(field_set: str, max_age=None):
+    # the fresh fields of every course scraped with the same field set, the
+    # log is rewritten with only those so it does not grow between runs.
+    # fields older than max_age seconds (the ttl if None) are not fresh
+    if not enabled or not os.path.exists(checkpoint_path):
+        return {}
+
+    max_age = ttl if max_age is None else max_age
+    now = time.time()
+    latest = {}
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # the last line of a run that was killed mid-write
+                continue
+
+            if entry.get('fieldSet') == field_set and now - entry['at'] < max_age:
+                latest[entry['id']] = entry
+
+    with _lock:
+        tmp_path = checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in latest.values():
+                f.write(json.dumps(entry) + "\n")
+
+        os.replace(tmp_path, checkpoint_path)
+
+    return {course_id: entry['fields'] for (course_id, entry) in latest.items()}
+
+
+def record(course_id: str, field_set: str, fields):
+    if not enabled:
+        return
+
+    line = json.dumps({
+        'id': course_id,
+        'fieldSet': field_set,
+        'at': time.time(),
+        'fields': fields,
+    })
+
+    with _lock:
+        with open(checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
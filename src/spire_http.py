@@ -0,0 +1,147 @@
+import os
+
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+import spire
+import spire_checkpoint
+from spire import SpireError
+
+# SETTINGS
+
+catalog_url = os.environ.get(
+    "SPIRE_CATALOG_URL",
+    "https://www.spire.umass.edu/psc/heproda/EMPLOYEE/SA/c/SA_LEARNER_SERVICES.SSS_BROWSE_CATLG_P.GBL"
+)
+timeout = int(os.environ.get("SPIRE_HTTP_TIMEOUT", "60"))
+
+
+class CatalogSession:
+    # replays the course catalog's PeopleSoft form posts without a browser.
+    # every page carries the hidden win0 form state (ICSID, ICStateNum, ...)
+    # which is posted back with the id of the element that was "clicked" as
+    # the ICAction, the server answers with the next full page
+
+    def __init__(self):
+        # every worker needs its own cookies, connections to spire are kept
+        # alive in the session's own pool
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=1))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=1))
+
+        self.soup = None
+        self.action = None
+        self.fields = {}
+
+    def load(self, res):
+        if res.status_code != 200:
+            raise SpireError(f"Spire answered {res.status_code} for {res.url}")
+
+        self.soup = BeautifulSoup(res.content, "html.parser")
+
+        form = self.soup.find("form", attrs={"name": "win0"}) or self.soup.find("form")
+        if not form:
+            raise SpireError(f"No catalog form on {res.url}")
+
+        self.action = urljoin(res.url, form.get("action") or res.url)
+        self.fields = {}
+        for input_element in form.find_all("input"):
+            name = input_element.get("name")
+            input_type = (input_element.get("type") or "text").lower()
+            if not name or input_type in ("submit", "button", "image", "reset"):
+                continue
+
+            if input_type in ("checkbox", "radio") and not input_element.has_attr("checked"):
+                continue
+
+            self.fields[name] = input_element.get("value", "")
+
+        for select_element in form.find_all("select"):
+            name = select_element.get("name")
+            option = select_element.find("option", selected=True) or select_element.find("option")
+            if name and option:
+                self.fields[name] = option.get("value", "")
+
+    def open(self):
+        try:
+            self.load(self.session.get(catalog_url, timeout=timeout))
+        except requests.RequestException as e:
+            raise SpireError(f"Unable to open the catalog: {e}")
+
+    def submit(self, action: str):
+        data = dict(self.fields)
+        data['ICAction'] = action
+        data['ICAJAX'] = "0"
+
+        try:
+            self.load(self.session.post(self.action, data=data, timeout=timeout))
+        except requests.RequestException as e:
+            raise SpireError(f"Unable to submit {action}: {e}")
+
+    def quit(self):
+        self.session.close()
+
+
+def start_client():
+    with spire.timed("catalog"):
+        client = CatalogSession()
+        client.open()
+
+    return client, {'letter': ""}
+
+
+def open_category(client: CatalogSession, state, category: str, pending):
+    category_letter = category[0]
+    if state['letter'] != category_letter:
+        client.submit("DERIVED_SSS_BCC_SSR_ALPHANUM_" + category_letter)
+        state['letter'] = category_letter
+
+    category_link = spire.find(
+        lambda elem: spire.CATEGORY_LINK[category].match(spire.clean(elem.get_text())),
+        client.soup.select("a.SSSHYPERLINKBOLD")
+    )
+    if not category_link:
+        raise SpireError(f"Unable to find category {category}")
+
+    category_link_id = category_link['id']
+    client.submit(category_link_id)
+
+    course_table = client.soup.select_one("table[id^=COURSE_LIST]")
+    if not course_table:
+        raise SpireError(f"Unable to find the courses of {category}")
+
+    course_link_id_list = [
+        (category + " " + spire.clean(link_element.get_text()).upper(), link_element['id'])
+        for link_element in course_table.select("a[id^=CRSE_NBR]")
+    ]
+    course_link_id_list = [ids for ids in course_link_id_list if ids[0] in pending]
+
+    return category_link_id, course_link_id_list
+
+
+def scrape_shard(client: CatalogSession, state, shard, pending):
+    (category, part, parts) = shard
+    with spire.timed("category"):
+        category_link_id, course_link_id_list = open_category(client, state, category, pending)
+
+    scraped = {}
+    for (course_id, link_id) in course_link_id_list[part::parts]:
+        with spire.timed("course"):
+            client.submit(link_id)
+            if not client.soup.find(id="ACE_DERIVED_SAA_CRS_GROUP1"):
+                raise SpireError(f"Unable to open {course_id}")
+
+            fields = spire.extract_course_fields(client.soup)
+        with spire.timed("return"):
+            client.submit("DERIVED_SAA_CRS_RETURN_PB")
+
+        spire_checkpoint.record(course_id, spire.FIELD_SET, fields)
+        scraped[course_id] = fields
+
+    with spire.timed("category close"):
+        client.submit(category_link_id)
+
+    return scraped
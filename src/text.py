@@ -0,0 +1,50 @@
+import re
+
+# CONSTANTS
+
+PREREQUISITE = re.compile(r"(undergraduate)? prerequisite(s)?:.+", re.I)
+REQUIREMENT_CREDITS = re.compile(r" \d credits(\.)?", re.M | re.I)
+DESCRIPTION_CREDITS = re.compile(r" \d credits\.", re.M | re.I)
+
+
+def clean_text(s: str) -> str:
+    # non breaking spaces, newlines and tabs become spaces and runs of spaces
+    # collapse into one. plain replaces measured faster than str.translate
+    # (slow once the table maps a non ascii character) and than a regex, each
+    # pass of the loop halves the longest run of spaces
+    s = s.replace('\xa0', ' ').replace('\n', ' ').replace('\t', ' ')
+    while '  ' in s:
+        s = s.replace('  ', ' ')
+
+    return s.strip()
+
+
+def split_requirement(description: str):
+    # (description, enrollment requirement) with the prerequisites and credit
+    # counts taken out of the description, the requirement is None if the
+    # description does not list any
+    requirement = None
+
+    prereq_match = PREREQUISITE.search(description)
+    if prereq_match:
+        description = description.replace(prereq_match.group(), "")
+        requirement = REQUIREMENT_CREDITS.sub("", prereq_match.group())
+
+    return DESCRIPTION_CREDITS.sub("", description), requirement
+
+
+def clean_description(course):
+    description, requirement = split_requirement(course.description)
+
+    course.description = description
+    if requirement is not None:
+        course.enrollmentRequirement = requirement
+
+    return course
+
+
+def clean_descriptions(courses):
+    # cleans the description of every course in a stream and pulls its
+    # enrollment requirement out, yielding each course as it is done
+    for course in courses:
+        yield clean_description(course)
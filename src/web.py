@@ -1,30 +1,75 @@
+import os
 import re
+import sys
+import time
+import hashlib
+import threading
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from datetime import datetime
 import pytz
 
 from unidecode import unidecode
 
-import requests
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+import cache
+import discovery
+import fetch
+import metrics
+from names import aliases
+from records import Course, Staff, Semester, Event
+from text import clean_text
 
-aliases = {
-    'Andrew Lan': 'Shiting Lan',
-    'Ivan Lee': 'Sunghoon Lee',
-    'Joe Chiu': 'Meng-Chieh Chiu'
-}
 local_zone = pytz.timezone("America/New_York")
 REGEXP_NAME_GROUP = "[a-zA-ZàáâäãåąčćęèéêëėįìíîïłńòóôöõøùúûüųūÿýżźñçčšžÀÁÂÄÃÅĄĆČĖĘÈÉÊËÌÍÎÏĮŁŃÒÓÔÖÕØÙÚÛÜŲŪŸÝŻŹÑßÇŒÆČŠŽ∂ð ,.'-]+"
 
+CICS_TITLE = re.compile(r'^(CICS|COMPSCI|INFO|INFOSEC)\s*(\w+):\s*([\w -:]+)', re.IGNORECASE)
+INSTRUCTORS = re.compile(r'^(Instructor\(s\): )(.+)', re.IGNORECASE)
+STAFF_PLACEHOLDER = re.compile(r'Staff', re.IGNORECASE)
+MATH_TITLE = re.compile(r'^(MATH|STAT|HONORS)\s*(\w+)(\.\d*)?:\s*([\w -:]+)', re.IGNORECASE)
+MATH_PREREQ_LABEL = re.compile(r"\s*prereq(uisite)?(s)?(:)?", re.I)
+STAFF_NAME = re.compile(r"^(%s),\s*(%s)" % (REGEXP_NAME_GROUP, REGEXP_NAME_GROUP))
+SEMESTER_TITLE = re.compile(r'^(university )?(spring|summer|fall|winter) (\d{4})', re.IGNORECASE)
+
+# SETTINGS
+
+# html5lib is the most forgiving parser but also by far the slowest one,
+# "lxml" or "html.parser" can be used instead
+html_parser = os.environ.get("HTML_PARSER", "html5lib")
+
+
+def with_class(class_name: str):
+    # matches a tag that has class_name among its classes. a plain class_
+    # filter compares it with the whole attribute while the tree is built, so
+    # it misses <div class="field-item even">
+    return re.compile(r"(^|\s)%s(\s|$)" % re.escape(class_name))
+
+
+# parse-only filters so every page only builds the part of the tree that is
+# read from it, html5lib can not build a partial tree and ignores them
+CICS_PAGE_ONLY = SoupStrainer(["title", "h2", "h3", "p"])
+MATH_INDEX_ONLY = SoupStrainer("select", id="edit-semester-tid")
+MATH_PAGE_ONLY = SoupStrainer("article")
+TABLE_ONLY = SoupStrainer("table")
+STAFF_DIRECTORY_ONLY = SoupStrainer("div", class_=with_class("view-content"))
+CALENDAR_ONLY = SoupStrainer("div", class_=with_class("field-item"))
 
-def clean_text(s: str):
-    for r in ['\xa0', '\n', '\t']:
-        s = s.replace(r, ' ')
+# reuse the records parsed from a page whose content did not change since the
+# last run, main turns this on for incremental runs
+memoize_pages = False
+# bump whenever the records a page is parsed into change
+PARSED_VERSION = 1
+# processes the pages of scrape_records are parsed in, with 1 or less they
+# are parsed in the calling thread
+parse_workers = int(os.environ.get("PARSE_WORKERS", str(os.cpu_count() or 1)))
 
-    while '  ' in s:
-        s = s.replace("  ", ' ')
+# STATE
 
-    return s.strip()
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
 
 
 def unicode_text_of(elem: Tag):
@@ -35,18 +80,121 @@ def text_of(elem: Tag) -> str:
     return clean_text(elem.text)
 
 
-def scrape(url: str):
-    try:
-        res = requests.get(url)
-        return BeautifulSoup(res.content, "html5lib")
-    except requests.ConnectionError:
+def parse(content, parse_only=None, parser=None):
+    if content is None:
         return None
 
+    parser = parser or html_parser
+    if parser == "html5lib":
+        return BeautifulSoup(content, parser)
+
+    return BeautifulSoup(content, parser, parse_only=parse_only)
+
+
+def scrape(url: str, parse_only=None):
+    content = fetch.fetch(url)
+
+    start = time.perf_counter()
+    soup = parse(content, parse_only)
+    metrics.record_parse(url, time.perf_counter() - start)
+
+    return soup
+
+
+def parsed_key(content: bytes, extract) -> str:
+    page_hash = hashlib.sha1(content)
+    page_hash.update(f"{PARSED_VERSION}:{extract.__name__}:{html_parser}".encode("utf-8"))
+
+    return page_hash.hexdigest()
+
+
+def parse_records(content, parse_only, extract, parser=None):
+    # the records extracted from a page and the seconds it took, this runs in
+    # a parse worker process when there are any
+    start = time.perf_counter()
+    records = list(extract(parse(content, parse_only, parser)))
+
+    return records, time.perf_counter() - start
+
+
+def get_parse_pool():
+    global _parse_pool
+
+    # the courses and the staff ask for it from threads of their own
+    with _parse_pool_lock:
+        if _parse_pool is None and parse_workers > 1:
+            # spawned rather than forked, the scrapers run next to other threads
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=parse_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+        return _parse_pool
+
+
+def close_parse_pool():
+    global _parse_pool
+
+    with _parse_pool_lock:
+        pool = _parse_pool
+        _parse_pool = None
+
+    if pool is not None:
+        pool.shutdown()
+
+
+def parsed(url: str, key, records, seconds: float):
+    metrics.record_parse(url, seconds)
+    if key:
+        cache.store_parsed(key, records)
+
+    return records
+
 
+def scrape_records(urls, extract, parse_only=None, final=()):
+    # fetches every url concurrently and returns the records extracted from
+    # each page, keyed by url. pages are handed to the parse workers as they
+    # arrive and only plain records come back, the caller merges them. the
+    # urls in final are pages that can not change anymore
+    pool = get_parse_pool()
+    records = {}
+    parsing = {}
+
+    for (url, content) in fetch.fetch_all(urls, final):
+        if content is None:
+            # the page could not be fetched, it is listed in metrics.skipped
+            records[url] = []
+            continue
+
+        key = None
+        if memoize_pages:
+            start = time.perf_counter()
+            key = parsed_key(content, extract)
+            memoized = cache.load_parsed(key)
+            if memoized is not None:
+                metrics.record_parse(url, time.perf_counter() - start, memoized=True)
+                records[url] = memoized
+                continue
+
+        if pool:
+            parsing[pool.submit(parse_records, content, parse_only, extract, html_parser)] = (url, key)
+        else:
+            records[url] = parsed(url, key, *parse_records(content, parse_only, extract))
+
+    for future in as_completed(parsing):
+        (url, key) = parsing[future]
+        records[url] = parsed(url, key, *future.result())
+
+    return records
+
+
+@metrics.staged
 def get_course_frequency():
+    # a table that could not be fetched leaves its courses without frequency
+
     # cics course frequency
-    soup = scrape("https://web.cs.umass.edu/csinfo/autogen/cmpscicoursesfull.html")
-    course_tr_list = soup.select("tr:not(:first-child)")
+    soup = scrape("https://web.cs.umass.edu/csinfo/autogen/cmpscicoursesfull.html", TABLE_ONLY)
+    course_tr_list = soup.select("tr:not(:first-child)") if soup else []
 
     def cics_course_frequency(elem: Tag):
         return (
@@ -54,14 +202,14 @@ def get_course_frequency():
                 text_of(elem.select_one("td:first-child")),
                 text_of(elem.select_one("td:nth-child(2)"))
             ),
-            text_of(elem.select_one("td:last-child"))
+            sys.intern(text_of(elem.select_one("td:last-child")))
         )
 
     course_frequency = list(map(cics_course_frequency, course_tr_list))
 
     # math course frequency
-    soup = scrape("https://www.math.umass.edu/course-offerings")
-    course_tr_list = soup.select("tr:not(:only-child)")
+    soup = scrape("https://www.math.umass.edu/course-offerings", TABLE_ONLY)
+    course_tr_list = soup.select("tr:not(:only-child)") if soup else []
 
     def math_course_frequency(elem: Tag):
         freq = text_of(elem.select_one("td:last-child"))
@@ -70,139 +218,230 @@ def get_course_frequency():
         else:
             freq = freq.replace('/', " and ").replace("  ", ' ')
 
-        return (text_of(elem.select_one("td:first-child")).upper(), freq)
+        return (text_of(elem.select_one("td:first-child")).upper(), sys.intern(freq))
 
     course_frequency.extend(map(math_course_frequency, course_tr_list))
 
     return course_frequency
 
 
-def scrape_courses():
-    course_map = {}
+def cics_section_of(header: Tag, instructor_line, description: str):
+    # the page heading has no children of its own and never matches a course
+    title_element = header.select_one(":first-child") or header
+    link_element = header.select_one("a")
 
-    # CICS Courses
-    current_year = int(datetime.now().year) % 2000 + 1
+    return (
+        text_of(title_element),
+        instructor_line,
+        description,
+        link_element['href'] if link_element else '',
+    )
 
-    for year in range(current_year, 17, -1):
-        for query_id in [7, 3]:
-            soup = scrape(f"https://web.cs.umass.edu/csinfo/autogen/cicsdesc1{year}{query_id}.html")
-            if not soup or (soup.title and soup.title.text == "404 Not Found"):
+
+def iter_cics_sections(soup):
+    # yields (title, instructor line, description, website) for every course
+    # header on a CICS description page. the children of each header container
+    # are walked once, a header takes the h3 right after it as its instructor
+    # line and the first following paragraph as its description
+    if not soup or (soup.title and soup.title.text == "404 Not Found"):
+        return
+
+    containers = {}
+    for header in soup.find_all("h2"):
+        containers.setdefault(id(header.parent), header.parent)
+
+    for container in containers.values():
+        waiting = []
+        previous = None
+
+        for elem in container.children:
+            if not isinstance(elem, Tag):
                 continue
 
-            for header in soup.select("h2:not(:first-child)"):
-                raw_title = text_of(header.select_one(":first-child"))
-                title_match = re.match(
-                    r'^(CICS|COMPSCI|INFO|INFOSEC)\s*(\w+):\s*([\w -:]+)',
-                    raw_title, re.IGNORECASE)
-                if not title_match or title_match.group(1) == 'INFOSEC':
-                    continue
-
-                course_subject = title_match.group(1)
-                course_id = (
-                    course_subject + ' ' + title_match.group(2)
-                ).upper()
-
-                session_staff = set()
-                next_sibling = list(header.next_siblings)[1]
-                if next_sibling.name == 'h3':
-                    if instructor_match := re.match(
-                        r'^(Instructor\(s\): )(.+)',
-                        text_of(next_sibling), re.IGNORECASE
-                    ):
-                        name_list = instructor_match.group(2).split(", ")
-
-                        for name in name_list:
-                            if not re.match(r'Staff', name, re.IGNORECASE):
-                                session_staff.add(unidecode(name.strip()))
-
-                if course_id in course_map:
-                    course_staff = course_map[course_id]['staff']
-
-                    for name in session_staff:
-                        course_staff.add(name)
-                else:
-                    course_title = title_match.group(3)
-                    course_description = text_of(header.find_next_sibling("p"))
-
-                    course = {
-                        'subject': course_subject,
-                        'id': course_id,
-                        'number': course_id.split()[1],
-                        'title': course_title,
-                        'description': course_description,
-                        'staff': session_staff,
-                    }
-
-                    course_website = header.select_one("a")['href']
-                    if len(course_website) > 0:
-                        course['website'] = course_website
-
-                    course_map[course_id] = course
+            if elem.name == 'h2' and previous is not None:
+                waiting.append([elem, None])
+            elif elem.name == 'h3' and waiting and previous is waiting[-1][0]:
+                waiting[-1][1] = text_of(elem)
+            elif elem.name == 'p' and waiting:
+                description = text_of(elem)
+                for (header, instructor_line) in waiting:
+                    yield cics_section_of(header, instructor_line, description)
 
-    for course in course_map.values():
-        course['staff'] = list(course['staff'])
+                waiting = []
 
-    # MATH Courses
-    soup = scrape("https://www.math.umass.edu/course-descriptions")
+            previous = elem
+
+        for (header, instructor_line) in waiting:
+            yield cics_section_of(header, instructor_line, '')
+
+
+def parse_cics_page(soup):
+    # yields (subject, id, title, description, staff, website) for every
+    # course on a CICS description page
+    for (raw_title, instructor_line, description, website) in iter_cics_sections(soup):
+        title_match = CICS_TITLE.match(raw_title)
+        if not title_match or title_match.group(1) == 'INFOSEC':
+            continue
+
+        course_subject = title_match.group(1)
+        course_id = (
+            course_subject + ' ' + title_match.group(2)
+        ).upper()
+
+        session_staff = set()
+        if instructor_line and (instructor_match := INSTRUCTORS.match(instructor_line)):
+            name_list = instructor_match.group(2).split(", ")
+
+            for name in name_list:
+                if not STAFF_PLACEHOLDER.match(name):
+                    session_staff.add(unidecode(name.strip()))
+
+        yield (
+            course_subject,
+            course_id,
+            title_match.group(3),
+            description,
+            sorted(session_staff),
+            website,
+        )
+
+
+def parse_math_index(soup):
     first_option = soup.select_one("#edit-semester-tid > option:first-child")
 
-    start = int(first_option['value'])
-    for i in range(start - 10, start + 1):
-        soup = scrape(f"https://www.math.umass.edu/course-descriptions?semester_tid={i}")
+    return int(first_option['value'])
 
-        for article in soup.select("div > article"):
-            raw_title = text_of(
-                article.select_one("div[class^='field-title']")
-            )
 
-            title_match = re.match(
-                r'^(MATH|STAT|HONORS)\s*(\w+)(\.\d*)?:\s*([\w -:]+)',
-                raw_title,
-                re.IGNORECASE
-            )
+def parse_math_page(soup):
+    course_list = []
 
-            if not title_match or title_match.group(1) == 'HONORS':
-                continue
+    # a partial tree only keeps the articles, so their div parent is gone
+    article_list = [
+        article for article in soup.find_all("article")
+        if article.parent.name in ("div", "[document]")
+    ]
 
-            course_subject = title_match.group(1)
-            if course_subject == 'STAT':
-                course_subject = 'STATISTIC'
+    for article in article_list:
+        raw_title = text_of(
+            article.select_one("div[class^='field-title']")
+        )
 
-            course_id = (course_subject + ' ' + title_match.group(2)).upper()
-            if course_id in course_map:
-                continue
+        title_match = MATH_TITLE.match(raw_title)
 
-            course_title = title_match.group(4)
-            course_description = text_of(article.select_one(
-                "div[class^='field-course-descr-description']"
-            ))
-
-            course = {
-                'subject': course_subject,
-                'id': course_id,
-                'number': course_id.split()[1],
-                'title': course_title,
-                'description': course_description,
-            }
-
-            course_prereqs = article.select_one(
-                "div[class^='field-course-descr-prereq']"
-            )
-            if course_prereqs:
-                course['enrollmentRequirement'] = "Prerequisites: " + re.sub(
-                    r"\s*prereq(uisite)?(s)?(:)?",
-                    "",
-                    text_of(course_prereqs),
-                    flags=re.I
-                ).strip()
+        if not title_match or title_match.group(1) == 'HONORS':
+            continue
+
+        course_subject = title_match.group(1)
+        if course_subject == 'STAT':
+            course_subject = 'STATISTIC'
+
+        course_id = (course_subject + ' ' + title_match.group(2)).upper()
+        course_title = title_match.group(4)
+        course_description = text_of(article.select_one(
+            "div[class^='field-course-descr-description']"
+        ))
+
+        course = {
+            'subject': course_subject,
+            'id': course_id,
+            'number': course_id.split()[1],
+            'title': course_title,
+            'description': course_description,
+        }
+
+        course_prereqs = article.select_one(
+            "div[class^='field-course-descr-prereq']"
+        )
+        if course_prereqs:
+            course['enrollmentRequirement'] = "Prerequisites: " + MATH_PREREQ_LABEL.sub(
+                "",
+                text_of(course_prereqs)
+            ).strip()
+
+        course_list.append(course)
+
+    return course_list
 
-            course_map[course_id] = course
 
-    for (course_id, freq) in get_course_frequency():
+def merge_cics_sections(sections, course_map):
+    # adds the sections of a CICS page to course_map, a course seen on an
+    # earlier page keeps its title and description and gains the staff
+    for section in sections:
+        (course_subject, course_id, course_title, course_description,
+         session_staff, course_website) = section
+
         if course_id in course_map:
-            course_map[course_id]['frequency'] = freq
+            course_staff = course_map[course_id].staff
+
+            for name in session_staff:
+                course_staff.add(sys.intern(name))
+        else:
+            course_map[course_id] = Course(
+                subject=course_subject,
+                id=course_id,
+                number=course_id.split()[1],
+                title=course_title,
+                description=course_description,
+                staff=set(map(sys.intern, session_staff)),
+                website=course_website or None,
+            )
+
+
+@metrics.staged
+def iter_courses():
+    # yields every course once it is complete. a CICS course can only be
+    # yielded once every CICS page is merged, math courses follow page by page
+    course_frequency = dict(get_course_frequency())
+    course_map = {}
+
+    # CICS Courses
+    current_year = int(datetime.now().year) % 2000 + 1
+
+    # pages are fetched concurrently but merged newest first, so the newest
+    # title and description of a course wins just like before. only the
+    # pages discovery knows or finds to be there are scraped
+    cics_urls, final_urls = discovery.discover([
+        (f"https://web.cs.umass.edu/csinfo/autogen/cicsdesc1{year}{query_id}.html", year)
+        for year in range(current_year, 17, -1)
+        for query_id in [7, 3]
+    ])
+    cics_pages = scrape_records(cics_urls, parse_cics_page, CICS_PAGE_ONLY, final_urls)
+
+    for url in cics_urls:
+        merge_cics_sections(cics_pages[url], course_map)
+
+    for course in course_map.values():
+        course.staff = sorted(course.staff)
+        course.frequency = course_frequency.get(course.id)
+
+        yield course
+
+    # MATH Courses
+    soup = scrape("https://www.math.umass.edu/course-descriptions", MATH_INDEX_ONLY)
+    if not soup:
+        # without the index there is no telling which pages to read
+        return
+
+    start = parse_math_index(soup)
+    math_urls = [
+        f"https://www.math.umass.edu/course-descriptions?semester_tid={i}"
+        for i in range(start - 10, start + 1)
+    ]
+    math_pages = scrape_records(math_urls, parse_math_page, MATH_PAGE_ONLY)
+
+    for url in math_urls:
+        for document in math_pages[url]:
+            if document['id'] not in course_map:
+                course_map[document['id']] = None
+
+                course = Course.from_document(document)
+                course.frequency = course_frequency.get(course.id)
 
-    return course_map
+                yield course
+
+
+def scrape_courses():
+    return {course.id: course for course in iter_courses()}
 
 
 def div_get(div_element, class_name: str, selector=None):
@@ -210,81 +449,99 @@ def div_get(div_element, class_name: str, selector=None):
     return div_element.select_one(sel)
 
 
-def retrieve_staff_information():
+def parse_staff_directory(soup):
+    # every staff member listed, and those that have a CICS profile page
     staff_list = []
+    profile_list = []
 
-    soup = scrape("https://www.cics.umass.edu/people/all-faculty-staff")
     for div_element in soup.select("div.view-content > div.clearfix > div"):
         name_element = div_get(div_element, "title", "span > a")
         raw_name = unicode_text_of(name_element)
-        name_match = re.match(r"^(%s),\s*(%s)" % (REGEXP_NAME_GROUP, REGEXP_NAME_GROUP), raw_name)
+        name_match = STAFF_NAME.match(raw_name)
         if not name_match: 
             raise RuntimeError(raw_name)
 
-        staff = {
-            'names': [f'{name_match.group(2)} {name_match.group(1)}'],
-            'title': text_of(div_get(div_element, "field-position")),
-            'email': text_of(div_get(div_element, "field-email", "a")),
-        }
+        staff = Staff(
+            names=[f'{name_match.group(2)} {name_match.group(1)}'],
+            title=text_of(div_get(div_element, "field-position")),
+            email=text_of(div_get(div_element, "field-email", "a")),
+        )
 
         phone_element = div_get(div_element, "field-phone")
         if phone_element:
-            staff['phone'] = text_of(phone_element)[3:]
+            staff.phone = text_of(phone_element)[3:]
 
         location_element= div_get(div_element, "field-location", "span.field-content")
         if location_element:
-            staff['office'] = text_of(location_element)
+            staff.office = text_of(location_element)
 
         website = name_element['href']
         if website[0] == '/':
-            staff['website'] = "https://www.cics.umass.edu" + website
+            staff.website = "https://www.cics.umass.edu" + website
+            profile_list.append(staff)
+        else:
+            staff.website = website
+
+        staff_list.append(staff)
 
-            staff_soup = scrape(staff['website'])
-            additional_name = unicode_text_of(staff_soup.select_one("#page-title"))
-            names = staff['names']
-            if additional_name not in names:
-                names.append(additional_name)
+    return staff_list, profile_list
 
-            img_element = staff_soup.select_one("div.content > div > div > img")
-            if img_element:
-                staff['photo'] = img_element['src']
 
-        else:
-            staff['website'] = website
+def parse_staff_profile(soup):
+    # (additional name, photo) from a staff member's CICS profile
+    additional_name = unicode_text_of(soup.select_one("#page-title"))
 
-        cics_name = staff['names'][0]
-        if cics_name in aliases and (alias := aliases[cics_name]) not in staff['names']:
-            staff['names'].append(alias)
+    img_element = soup.select_one("div.content > div > div > img")
 
-        staff_list.append(staff)
+    return additional_name, img_element['src'] if img_element else None
 
-    return staff_list
 
+@metrics.staged
+def retrieve_staff_information():
+    soup = scrape("https://www.cics.umass.edu/people/all-faculty-staff", STAFF_DIRECTORY_ONLY)
+    if not soup:
+        return []
 
-def get_academic_schedule():
-    soup = scrape(
-        'https://www.umass.edu/registrar/calendars/academic-calendar'
+    staff_list, profile_list = parse_staff_directory(soup)
+
+    # profile pages are fetched concurrently once the directory is read
+    profile_pages = scrape_records(
+        [staff.website for staff in profile_list],
+        parse_staff_profile
     )
+    for staff in profile_list:
+        if not profile_pages[staff.website]:
+            # the profile could not be fetched, the directory entry is kept
+            continue
+
+        additional_name, photo = profile_pages[staff.website]
+        names = staff.names
+        if additional_name not in names:
+            names.append(additional_name)
+
+        if photo:
+            staff.photo = photo
+
+    for staff in staff_list:
+        cics_name = staff.names[0]
+        if cics_name in aliases and (alias := aliases[cics_name]) not in staff.names:
+            staff.names.append(alias)
 
+    return staff_list
+
+
+def parse_academic_calendar(soup):
     semester_list = []
     for header in soup.select(".field-item h3"):
         semester_title = text_of(header)
 
-        match = re.match(
-            r'^(university )?(spring|summer|fall|winter) (\d{4})',
-            semester_title,
-            re.IGNORECASE
-        )
+        match = SEMESTER_TITLE.match(semester_title)
         if not match:
             continue
 
         year = match.group(3)
         season = match.group(2)
-        semester = {
-            'season': season,
-            'year': year,
-            'events': [],
-        }
+        semester = Semester(season=season, year=year, events=[])
 
         table = header.find_next("table")
         for event_element in table.select("tr"):
@@ -301,15 +558,24 @@ def get_academic_schedule():
             utc_time = local_zone.localize(native_time).astimezone(pytz.utc)
 
             if re.match(event_desc, 'First day of classes', re.IGNORECASE):
-                semester['startDate'] = utc_time
+                semester.startDate = utc_time
             elif re.match(event_desc, 'Last day of classes', re.IGNORECASE):
-                semester['endDate'] = utc_time
+                semester.endDate = utc_time
 
-            semester['events'].append({
-                'date': utc_time,
-                'description': event_desc,
-            })
+            semester.events.append(Event(date=utc_time, description=event_desc))
 
         semester_list.append(semester)
 
     return semester_list
+
+
+@metrics.staged
+def get_academic_schedule():
+    soup = scrape(
+        'https://www.umass.edu/registrar/calendars/academic-calendar',
+        CALENDAR_ONLY
+    )
+    if not soup:
+        return []
+
+    return parse_academic_calendar(soup)
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import cache
+import fetch
+import metrics
+
+
+class Site:
+    # a local server that answers every path with the next of the answers
+    # given for it, the last one over and over. an answer is
+    # (status, body, seconds to wait before answering)
+
+    def __init__(self):
+        self.answers = {}
+        self.requests = {}
+        self.lock = threading.Lock()
+
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with site.lock:
+                    seen = site.requests.get(self.path, 0)
+                    site.requests[self.path] = seen + 1
+                    answers = site.answers[self.path]
+                    (status, body, delay) = answers[min(seen, len(answers) - 1)]
+
+                time.sleep(delay)
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path, *answers):
+        self.answers[path] = answers
+
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+
+@pytest.fixture
+def site(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, "cache_dir", str(tmp_path))
+    monkeypatch.setattr(cache, "enabled", True)
+    monkeypatch.setattr(cache, "offline", False)
+    monkeypatch.setattr(cache, "ttl", 0)
+    monkeypatch.setattr(fetch, "backoff", 0.01)
+    monkeypatch.setattr(fetch, "retries", 2)
+    monkeypatch.setattr(fetch, "max_rate", 1000.0)
+    monkeypatch.setattr(fetch, "timeout", (1.0, 0.2))
+    monkeypatch.setattr(fetch, "_hosts", {})
+    metrics.reset()
+
+    site = Site()
+    yield site
+
+    fetch.close_session()
+    site.server.shutdown()
+
+
+def test_retries_a_server_error(site):
+    url = site.url("/flaky", (503, b"busy", 0), (200, b"page", 0))
+
+    assert fetch.fetch(url) == b"page"
+    assert site.requests["/flaky"] == 2
+    assert metrics.fetches[-1]['status'] == 200
+    assert not metrics.skipped
+
+
+def test_retries_a_timeout(site):
+    url = site.url("/slow", (200, b"late", 1.0), (200, b"page", 0))
+
+    assert fetch.fetch(url) == b"page"
+    assert site.requests["/slow"] == 2
+
+
+def test_skips_a_page_that_keeps_timing_out(site):
+    url = site.url("/slow", (200, b"late", 1.0))
+
+    assert fetch.fetch(url) is None
+    assert site.requests["/slow"] == fetch.retries + 1
+    assert metrics.skipped == [(url, "timed out")]
+
+
+def test_breaker_trips_after_failed_pages(site, monkeypatch):
+    monkeypatch.setattr(fetch, "retries", 0)
+    monkeypatch.setattr(fetch, "breaker_failures", 2)
+
+    urls = [site.url(f"/down/{i}", (500, b"error", 0)) for i in range(3)]
+    for url in urls:
+        assert fetch.fetch(url) is None
+
+    # the third page is not asked for, the host is left alone until the cooldown is over
+    assert "/down/2" not in site.requests
+    assert metrics.skipped == [
+        (urls[0], "status 500"),
+        (urls[1], "status 500"),
+        (urls[2], "circuit open"),
+    ]
+
+
+def test_success_resets_the_breaker(site, monkeypatch):
+    monkeypatch.setattr(fetch, "retries", 0)
+    monkeypatch.setattr(fetch, "breaker_failures", 2)
+
+    assert fetch.fetch(site.url("/down/0", (500, b"error", 0))) is None
+    assert fetch.fetch(site.url("/up", (200, b"page", 0))) == b"page"
+    assert fetch.fetch(site.url("/down/1", (500, b"error", 0))) is None
+
+    assert fetch.fetch(site.url("/up/again", (200, b"page", 0))) == b"page"
+
+
+def test_falls_back_to_a_stale_copy(site, monkeypatch):
+    monkeypatch.setattr(fetch, "retries", 0)
+    url = site.url("/page", (200, b"old", 0), (500, b"error", 0))
+
+    assert fetch.fetch(url) == b"old"
+    assert fetch.fetch(url) == b"old"
+    assert [request['source'] for request in metrics.fetches] == ["network", "stale"]
+    assert not metrics.skipped
+
+
+def test_skips_a_missing_page(site):
+    url = site.url("/gone", (404, b"Not Found", 0))
+
+    assert fetch.fetch(url) is None
+    assert site.requests["/gone"] == 1
+    assert metrics.skipped == [(url, "status 404")]
+    assert cache.lookup(url) is None
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from names import NameIndex, text_scores
+
+
+STAFF = [
+    {'_id': 0, 'names': ["David Jensen"]},
+    {'_id': 1, 'names': ["Ivan Lee", "Sunghoon Lee"]},
+    {'_id': 2, 'names': ["Marco Serafini"]},
+]
+
+
+def test_text_scores_like_mongo():
+    assert text_scores(["David Jensen"]) == {'david': 0.75, 'jensen': 0.75}
+    assert text_scores(["Ivan Lee", "Sunghoon Lee"])['lee'] == 1.5
+    assert round(text_scores(["Cher"])['cher'], 6) == 1.1
+
+
+def test_exact_names():
+    index = NameIndex(STAFF)
+
+    assert index.lookup("David Jensen")['_id'] == 0
+    assert index.lookup("Sunghoon Lee")['_id'] == 1
+
+
+def test_one_shared_word_is_not_a_match():
+    index = NameIndex(STAFF)
+
+    assert index.lookup("David Smith") is None
+    assert index.lookup("Kevin Lee") is None
+
+
+def test_every_word_matching_is_a_match():
+    index = NameIndex(STAFF)
+
+    assert index.lookup("Jensen David")['_id'] == 0
+    assert index.lookup("Lee Sunghoon")['_id'] == 1
+
+
+def test_shortened_names():
+    index = NameIndex(STAFF)
+
+    assert index.lookup("Dav Jensen")['_id'] == 0
+    assert index.lookup("Marco A Serafini")['_id'] == 2
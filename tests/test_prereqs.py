@@ -0,0 +1,87 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from prereqs import build, parse_requirement
+
+
+def test_subjects_carry_over_to_bare_numbers():
+    assert parse_requirement("Prerequisite: COMPSCI 220 or 230, and MATH 131") == [
+        "COMPSCI 220", "COMPSCI 230", "MATH 131"
+    ]
+
+
+def test_subject_aliases():
+    assert parse_requirement("CMPSCI 187 and STATS 240") == ["COMPSCI 187", "STATISTIC 240"]
+    assert parse_requirement("Informatics 101") == ["INFO 101"]
+
+
+def test_subjects_outside_the_catalog():
+    assert parse_requirement("PHYSICS 151 and ECE 232") == ["PHYSICS 151", "ECE 232"]
+    assert parse_requirement("Physics 151") == []
+
+
+def test_numbers_that_are_not_courses():
+    assert parse_requirement("INFO 248. Open to 300-level students") == ["INFO 248"]
+    assert parse_requirement("MATH 131 with a GPA 3.000 or higher") == ["MATH 131"]
+    assert parse_requirement("Open to 300-level students") == []
+    assert parse_requirement("Prerequisite: COMPSCI 187 and completion of 120 credits") == ["COMPSCI 187"]
+    assert parse_requirement("MATH 131 or equivalent, 100 level course") == ["MATH 131"]
+    assert parse_requirement("MATH 131 or a 200 Level course") == ["MATH 131"]
+
+
+def test_text_without_courses():
+    assert parse_requirement("Open to majors only") == []
+    assert parse_requirement(None) == []
+
+
+def documents_by_id(courses):
+    return {document['id']: document for document in build(courses)}
+
+
+def test_chain():
+    documents = documents_by_id([
+        {'id': "COMPSCI 121", 'enrollmentRequirement': None},
+        {'id': "COMPSCI 187", 'enrollmentRequirement': "Prerequisite: COMPSCI 121"},
+        {'id': "COMPSCI 220", 'enrollmentRequirement': "Prerequisite: COMPSCI 187 and MATH 132"},
+    ])
+
+    assert documents["COMPSCI 220"]['prerequisites'] == ["COMPSCI 187", "MATH 132"]
+    assert documents["COMPSCI 220"]['allPrerequisites'] == ["COMPSCI 121", "COMPSCI 187", "MATH 132"]
+    assert documents["COMPSCI 121"]['dependents'] == ["COMPSCI 187"]
+    assert documents["COMPSCI 121"]['allDependents'] == ["COMPSCI 187", "COMPSCI 220"]
+    assert [documents[course_id]['level'] for course_id in ["COMPSCI 121", "COMPSCI 187", "COMPSCI 220"]] == [0, 1, 2]
+
+
+def test_courses_outside_the_catalog_have_no_document():
+    documents = documents_by_id([
+        {'id': "COMPSCI 250", 'enrollmentRequirement': "Prerequisite: ECE 232"},
+    ])
+
+    assert list(documents) == ["COMPSCI 250"]
+    assert documents["COMPSCI 250"]['allPrerequisites'] == ["ECE 232"]
+    assert documents["COMPSCI 250"]['level'] == 1
+
+
+def test_cycles():
+    documents = documents_by_id([
+        {'id': "MATH 131", 'enrollmentRequirement': None},
+        {'id': "MATH 233", 'enrollmentRequirement': "MATH 131 and MATH 235"},
+        {'id': "MATH 235", 'enrollmentRequirement': "MATH 233"},
+        {'id': "MATH 411", 'enrollmentRequirement': "MATH 235"},
+    ])
+
+    assert documents["MATH 233"]['allPrerequisites'] == ["MATH 131", "MATH 235"]
+    assert documents["MATH 235"]['allPrerequisites'] == ["MATH 131", "MATH 233"]
+    assert documents["MATH 233"]['level'] == documents["MATH 235"]['level'] == 1
+    assert documents["MATH 411"]['level'] == 2
+
+
+def test_a_course_naming_itself():
+    documents = documents_by_id([
+        {'id': "INFO 114", 'enrollmentRequirement': "Prerequisite: INFO 114"},
+    ])
+
+    assert documents["INFO 114"]['prerequisites'] == []
+    assert documents["INFO 114"]['level'] == 0